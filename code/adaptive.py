@@ -0,0 +1,185 @@
+from dataset import SweepDataset
+from resultstore import ResultStore
+from sweep import run_point, screened
+import numpy as np
+import pandas as pd
+
+
+class AdaptiveGrid:
+    """
+    Adaptive sampling of the number of iterations over a decay x sigma grid. The grid is first sampled coarsely, and
+    blocks are only subdivided where the number of iterations changes sharply between their corners. Corners of such
+    blocks lie close to the transition and get extra replicas while their results vary a lot. Cells inside smooth blocks
+    are bilinearly interpolated from the corners instead of simulated.
+    """
+    def __init__(self, params, steps, decays, sigmas, store=None, coarse=4, tolerance=0.1, max_replicas=4, seed=0,
+                 surrogate=None, tuner=None):
+        """
+        :param params: dict, keyword arguments of Environment other than decay and sigma
+        :param steps: int, maximum number of time-steps of a simulation
+        :param decays: array of decays, the rows of the grid
+        :param sigmas: array of sigmas, the columns of the grid
+        :param store: ResultStore or None
+        :param coarse: int, number of samples per axis in the initial grid
+        :param tolerance: float, fraction of steps by which the corners of a block may differ before it is subdivided
+        :param max_replicas: int, maximum number of replicas of a point near the transition
+        :param seed: int, seed of the first replica, further replicas use the following seeds
+        :param surrogate: MeanField or None, points it screens out are not simulated but get steps - 1 (see
+                          sweep.screened)
+        :param tuner: AutoTuner or None, picks the fastest execution options of the Environment
+        """
+        self.params = params
+        self.steps = steps
+        self.decays = decays
+        self.sigmas = sigmas
+        self.store = store
+        self.tolerance = tolerance * steps
+        self.max_replicas = max_replicas
+        self.seed = seed
+        self.surrogate = surrogate
+        self.tuner = tuner
+        self.simulations = 0
+
+        self.coarse_rows = np.unique(np.linspace(0, len(decays) - 1, coarse).round().astype(int))
+        self.coarse_cols = np.unique(np.linspace(0, len(sigmas) - 1, coarse).round().astype(int))
+
+        self.iterations = np.full((len(decays), len(sigmas)), np.nan)
+        self.replicas = {}
+        self.screened = set()
+
+    def evaluate(self, i, j, replicas=1):
+        """
+        Make sure the point (i, j) has at least the given number of replicas, and returns the mean iteration.
+        """
+        runs = self.replicas.setdefault((i, j), [])
+        params = dict(self.params, decay=self.decays[i], sigma=self.sigmas[j])
+        if screened(params, self.surrogate):
+            self.screened.add((i, j))
+            runs[:] = [self.steps - 1] * max(replicas, len(runs))
+
+        while len(runs) < replicas:
+            runs.append(run_point(params, self.steps, self.seed + len(runs), self.store, self.tuner))
+            self.simulations += 1
+
+        self.iterations[i, j] = np.mean(runs)
+        return self.iterations[i, j]
+
+    def replicate(self, i, j):
+        """
+        Add replicas to a point near the transition until the standard error of its mean is within the tolerance.
+        """
+        replicas = max(2, len(self.replicas[(i, j)]))
+        self.evaluate(i, j, replicas)
+
+        while replicas < self.max_replicas:
+            runs = self.replicas[(i, j)]
+            if np.std(runs, ddof=1) / np.sqrt(len(runs)) <= self.tolerance / 2:
+                break
+
+            replicas += 1
+            self.evaluate(i, j, replicas)
+
+    def refine(self, i0, i1, j0, j1):
+        """
+        Refine the block with corners (i0, j0) and (i1, j1), the corners are already evaluated.
+        """
+        corners = [(i0, j0), (i0, j1), (i1, j0), (i1, j1)]
+        values = [self.iterations[c] for c in corners]
+
+        if max(values) - min(values) <= self.tolerance or (i1 - i0 <= 1 and j1 - j0 <= 1):
+            self.interpolate(i0, i1, j0, j1)
+            return
+
+        # a sharp change, sample the transition more accurately
+        for i, j in corners:
+            self.replicate(i, j)
+
+        im = (i0 + i1) // 2
+        jm = (j0 + j1) // 2
+        rows = [i0, im, i1] if i1 - i0 > 1 else [i0, i1]
+        cols = [j0, jm, j1] if j1 - j0 > 1 else [j0, j1]
+
+        for i in rows:
+            for j in cols:
+                if (i, j) not in self.replicas:
+                    self.evaluate(i, j)
+
+        for a, b in zip(rows[:-1], rows[1:]):
+            for c, d in zip(cols[:-1], cols[1:]):
+                self.refine(a, b, c, d)
+
+    def interpolate(self, i0, i1, j0, j1):
+        """
+        Fill the cells of a smooth block that were not simulated by bilinear interpolation of its corners.
+        """
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                if (i, j) in self.replicas:
+                    continue
+
+                u = (i - i0) / (i1 - i0) if i1 > i0 else 0
+                v = (j - j0) / (j1 - j0) if j1 > j0 else 0
+                self.iterations[i, j] = (self.iterations[i0, j0] * (1 - u) * (1 - v) +
+                                         self.iterations[i0, j1] * (1 - u) * v +
+                                         self.iterations[i1, j0] * u * (1 - v) +
+                                         self.iterations[i1, j1] * u * v)
+
+    def run(self):
+        """
+        Returns the number of iterations over the full grid, in the same format as getdata.plot2d.
+        :return: DataFrame with the columns decay, sigma, iteration and method, the iteration is the mean of the
+                 replicas of a simulated cell, and the method "interpolation" for cells that were not simulated
+        """
+        for i in self.coarse_rows:
+            for j in self.coarse_cols:
+                self.evaluate(i, j)
+
+        for i0, i1 in zip(self.coarse_rows[:-1], self.coarse_rows[1:]):
+            for j0, j1 in zip(self.coarse_cols[:-1], self.coarse_cols[1:]):
+                self.refine(i0, i1, j0, j1)
+
+        df = pd.DataFrame(columns=["decay", "sigma", "iteration", "method"])
+        row = 0
+        for i, decay in enumerate(self.decays):
+            for j, sigma in enumerate(self.sigmas):
+                if (i, j) in self.screened:
+                    method = "surrogate"
+                elif (i, j) in self.replicas:
+                    method = "simulation"
+                else:
+                    method = "interpolation"
+                df.loc[row] = [decay, sigma, self.iterations[i, j], method]
+                row += 1
+
+        return df
+
+
+def adaptive2d(width, height, steps, decays, sigmas, strength, store=None, **kwargs):
+    """
+    Adaptive version of getdata.plot2d, see AdaptiveGrid for the keyword arguments.
+    """
+    params = dict(width=width, height=height, n_colonies=1, n_ants=30, n_obstacles=10,
+                  moore=False, pheromone_strength=strength)
+    grid = AdaptiveGrid(params, steps, decays, sigmas, store, **kwargs)
+    df = grid.run()
+    print("{} simulations for {} cells".format(grid.simulations, len(decays) * len(sigmas)))
+
+    return df
+
+
+if __name__ == '__main__':
+    width = 26
+    height = 26
+    steps = 1300
+    n = 12
+    decays = np.linspace(0.7, 0.99, num=n)
+    sigmas = np.linspace(0.01, 0.6, num=n)
+    pheromone_strengths = np.linspace(0.8, 2.5, num=n)
+
+    store = ResultStore("./data/results.sqlite")
+    dataset = SweepDataset("./data/sweeps")
+
+    for strength in pheromone_strengths:
+        df = adaptive2d(width, height, steps, decays, sigmas, strength, store)
+        dataset.append(df, steps=steps, seed=0, source="adaptive", width=width, height=height, n_colonies=1,
+                       n_ants=30, n_obstacles=10, moore=False, pheromone_strength=strength)
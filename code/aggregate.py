@@ -0,0 +1,228 @@
+import math
+import numpy as np
+from sweep import run_replica
+
+
+class P2Quantile:
+    """
+    Estimates a quantile online with the P-square algorithm of Jain and Chlamtac, in constant memory: five markers
+    whose heights are adjusted with a piecewise-parabolic fit as observations come in.
+    """
+    def __init__(self, p):
+        """
+        :param p: float, the quantile between 0 and 1
+        """
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        """
+        Add an observation.
+        """
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # find the cell of x, and move the extreme markers when x falls outside them
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if heights[i] <= x < heights[i + 1])
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # adjust the middle markers that are off their desired position
+        for i in range(1, 4):
+            d = self.desired[i] - self.positions[i]
+            if (d >= 1 and self.positions[i + 1] - self.positions[i] > 1) or \
+                    (d <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self.linear(i, d)
+                heights[i] = height
+                self.positions[i] += d
+
+    def parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                                                   (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def linear(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    @property
+    def value(self):
+        """
+        The current estimate, exact for up to five observations and NaN without observations.
+        """
+        if len(self.heights) < 5:
+            if not self.heights:
+                return float("nan")
+            return float(np.quantile(self.heights, self.p))
+
+        return self.heights[2]
+
+
+class RunningStats:
+    """
+    Running count, mean, variance and quantiles of a stream of values, updated with Welford's algorithm. NaN values
+    (e.g. the path length of a run in which no ant found food) are counted as missing and otherwise ignored.
+    """
+    def __init__(self, quantiles=(0.1, 0.5, 0.9)):
+        """
+        :param quantiles: tuple of quantiles to estimate, see P2Quantile
+        """
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x):
+        """
+        Add a value.
+        """
+        if x is None or math.isnan(x):
+            self.missing += 1
+            return
+
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+
+    @property
+    def variance(self):
+        """
+        The sample variance, NaN for less than two values.
+        """
+        return self._m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def sem(self):
+        """
+        The standard error of the mean.
+        """
+        return self.std / math.sqrt(self.count) if self.count > 1 else float("nan")
+
+    def half_width(self, confidence=0.95):
+        """
+        Returns the half-width of the Student-t confidence interval of the mean, infinite for less than two values.
+        """
+        from scipy.stats import t
+
+        if self.count < 2:
+            return float("inf")
+
+        return float(t.ppf((1 + confidence) / 2, self.count - 1) * self.sem)
+
+    def summary(self, confidence=0.95):
+        """
+        Returns the statistics as a dict.
+        """
+        result = {"n": self.count, "missing": self.missing, "mean": self.mean, "std": self.std,
+                  "ci": self.half_width(confidence)}
+        result.update({"q{:g}".format(p): estimator.value for p, estimator in self.quantiles.items()})
+        return result
+
+
+class ReplicaAggregator:
+    """
+    Runs replicas (seeds 0, 1, 2, ...) of a parameter point and keeps running statistics of the iteration count and
+    the path length metrics. It stops when the confidence interval of the mean iteration count is narrower than target,
+    so points with little variance get few replicas and noisy points more, up to max_replicas. Replicas in the store
+    are not run again.
+    """
+    names = ("iteration", "min path length", "mean min path length")
+
+    def __init__(self, params, steps, store=None, target=50, relative=False, min_replicas=3, max_replicas=30,
+                 confidence=0.95, seed=0, tuner=None):
+        """
+        :param params: dict of arguments of Environment
+        :param steps: int, maximum number of time-steps of a run
+        :param store: ResultStore or None
+        :param target: float, the half-width of the confidence interval of the mean iteration count to stop at
+        :param relative: boolean, True if target is a fraction of the mean instead of a number of iterations
+        :param min_replicas: int, number of replicas to run before testing the interval
+        :param max_replicas: int, maximum number of replicas
+        :param confidence: float, confidence level of the interval
+        :param seed: int, seed of the first replica
+        :param tuner: AutoTuner or None, picks the fastest execution options of the Environment
+        """
+        self.params = params
+        self.steps = steps
+        self.store = store
+        self.target = target
+        self.relative = relative
+        self.min_replicas = max(min_replicas, 2)
+        self.max_replicas = max_replicas
+        self.confidence = confidence
+        self.seed = seed
+        self.tuner = tuner
+
+        self.stats = {name: RunningStats() for name in self.names}
+        self.replicas = 0
+
+    def add(self, result):
+        """
+        Add the result of a replica, a dict as returned by run_replica.
+        """
+        for name, stats in self.stats.items():
+            stats.add(result[name])
+        self.replicas += 1
+
+    def converged(self):
+        """
+        Returns True when the confidence interval of the mean iteration count is narrower than the target.
+        """
+        iterations = self.stats["iteration"]
+        if self.replicas < self.min_replicas:
+            return False
+
+        target = self.target * abs(iterations.mean) if self.relative else self.target
+        return iterations.half_width(self.confidence) <= target
+
+    def done(self):
+        return self.replicas >= self.max_replicas or self.converged()
+
+    def run(self):
+        """
+        Run replicas until the interval is narrow enough or max_replicas is reached.
+        :return: dict, see summary
+        """
+        while not self.done():
+            self.add(run_replica(self.params, self.steps, self.seed + self.replicas, self.store, self.tuner))
+
+        return self.summary()
+
+    def summary(self):
+        """
+        Returns the number of replicas, whether the target was reached, and the statistics of every metric as
+        "<metric> <statistic>", e.g. "iteration mean" and "iteration ci".
+        """
+        result = {"replicas": self.replicas, "converged": self.converged()}
+        for name, stats in self.stats.items():
+            result.update({name + " " + key: value for key, value in stats.summary(self.confidence).items()})
+
+        return result
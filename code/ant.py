@@ -1,43 +1,68 @@
+from array import array
 import numpy as np
-from mesa import Agent
-import matplotlib.patches as patches
 from obstacle import Obstacle
+from pathbuffer import PathBuffer
+import metrics
 
 
-class Ant(Agent):
-    """An agent with fixed legs."""
-    def __init__(self, unique_id, colony, death=True):
-        super().__init__(unique_id, colony.environment)
+class Ant:
+    """
+    An agent with fixed legs. Ants use __slots__ instead of deriving from mesa.Agent to keep them small, the positions
+    of the path are stored in a PathBuffer and the patch used for animation is kept by the Environment.
+    """
+    __slots__ = ("unique_id", "model", "environment", "colony", "pheromone_id", "death", "alive", "slowScore", "pos",
+                 "history", "encounters", "return_to_colony", "carry_food", "carry_capacity", "max_energy", "energy",
+                 "energy_consumption", "last_steps", "path_lengths", "min_path_length", "trips")
+
+    # Agent constants
+    persistance = 0
+    memory = 3
 
-        # Agent constants
-        self.persistance = 0
-        self.memory = 3
+    # Animation attributes
+    size = 0.4
+
+    def __init__(self, unique_id, colony, death=True):
+        self.model = colony.environment
         self.environment = colony.environment
         self.colony = colony
         self.pheromone_id = colony.pheromone_id
+        self.death = death
+
+        # Grids up to 32767 cells wide fit in int16 coordinates
+        dtype = np.int16 if max(self.environment.width, self.environment.height) < 2 ** 15 else np.int32
+        self.history = PathBuffer(colony.pos, dtype=dtype)
+        self.last_steps = np.empty((self.memory, 2), dtype=dtype)
+
+        self.reset(unique_id)
+
+    def reset(self, unique_id):
+        """
+        (Re)initialise the attributes of a newborn ant, new traits are drawn. Dead ants are reused this way by the
+        colony instead of allocating a new Ant.
+        :param unique_id: int, the id of the newborn ant
+        """
+        self.unique_id = unique_id
 
         # Agent attributes
         self.alive = True
-        self.death = death
         self.slowScore = 0
-        self.pos = colony.pos
-        self.history = [colony.pos]
+        self.pos = self.colony.pos
+        self.history.reset(self.colony.pos)
         self.encounters = 0
 
         self.return_to_colony = False
         self.carry_food = 0
-        self.carry_capacity = np.abs(np.random.normal(10))
-        self.max_energy = np.abs(np.random.normal(15))
+        self.carry_capacity = float(np.abs(np.random.normal(10)))
+        self.max_energy = float(np.abs(np.random.normal(15)))
         self.energy = self.max_energy
-        self.energy_consumption = np.abs(np.random.normal(0.05, 0.05)) + 0.01
-
-        self.last_steps = [self.pos for _ in range(self.memory)]
+        self.energy_consumption = float(np.abs(np.random.normal(0.05, 0.05))) + 0.01
 
-        self.path_lengths = [np.nan]
+        self.last_steps[:] = self.pos
 
-        # Animation attributes
-        self._patch = None
-        self.size = 0.4
+        # bounded runs only keep the shortest path and the number of trips, see metrics.record_trip
+        self.path_lengths = None if self.environment.bounded else array('d', [np.nan])
+        self.min_path_length = np.nan
+        self.trips = 0
 
     def step_energy(self):
         """
@@ -68,7 +93,10 @@ class Ant(Agent):
 
                 self.carry_food += min_pickup
 
-            self.path_lengths.append(len(self.history) + 1)
+            length = len(self.history) + 1
+            if self.path_lengths is not None:
+                self.path_lengths.append(length)
+            metrics.record_trip(self.environment, self, length)
             self.return_to_colony = True
 
     def check_colony(self):
@@ -78,7 +106,7 @@ class Ant(Agent):
 
             self.colony.stash_food(self.carry_food)
             self.carry_food = 0
-            self.history = [self.pos]
+            self.history.reset(self.pos)
             self.return_to_colony = False
 
     def step(self):
@@ -103,9 +131,32 @@ class Ant(Agent):
         self.check_colony()
 
         if self.death:
-            if self.energy < self.max_energy / 2 and not self.return_to_colony and not self.colony.food_stash == 0:
-                self.history.pop()
-                self.return_to_colony = True
+            self.check_return()
+
+    def check_return(self):
+        """
+        Turn back to the colony when the ant is running low on energy and the colony has food to eat.
+        """
+        if self.energy < self.max_energy / 2 and not self.return_to_colony and not self.colony.food_stash == 0:
+            self.history.pop()
+            self.return_to_colony = True
+
+    def skip(self, steps):
+        """
+        Fast-forward a number of time-steps in which the ant is stalled on an obstacle. Only the bookkeeping of those
+        steps is done, the ant does not move. Used by the EventActivation scheduler.
+        :param steps: int, number of stalled time-steps
+        """
+        self.slowScore = max(0, self.slowScore - steps)
+
+        # the same energy guard as step, so a skipped step costs exactly what a stalled step would
+        if not self.death:
+            for _ in range(steps):
+                self.step_energy()
+                if not self.alive:
+                    return
+        elif steps:
+            self.check_return()
 
     @property
     def on_obstacle(self):
@@ -183,42 +234,50 @@ class Ant(Agent):
                 self.add_pos_to_history()
 
             if self.on_obstacle:
-                self.slowScore += [x for x in self.environment.grid[self.pos[0]][self.pos[1]] if isinstance(x, Obstacle)][0].cost
+                cost = [x for x in self.environment.grid[self.pos[0]][self.pos[1]] if isinstance(x, Obstacle)][0].cost
+                self.slowScore += int(np.ceil(cost))
         else:
             self.slowScore -= 1
 
     def add_pos_to_history(self):
         """
-        Add current position to the history, keeps track of duplicate positions and cuts of the resulting loop
+        Add current position to the history, keeps track of duplicate positions and cuts of the resulting loop. An ant
+        whose path reaches the max_history of the environment turns back to the colony along its path.
         """
         if not self.on_food:
             self.history.append(self.pos)
             first_occurrence = self.history.index(self.pos)
             if first_occurrence != len(self.history) - 1:
-                self.history = self.history[:first_occurrence + 1]
-            self.last_steps.append(self.pos)
-            self.last_steps.pop(0)
+                self.history.truncate(first_occurrence + 1)
+            elif self.environment.max_history and len(self.history) >= self.environment.max_history:
+                self.history.pop()
+                self.return_to_colony = True
+            self.last_steps[:-1] = self.last_steps[1:]
+            self.last_steps[-1] = self.pos
 
-    def update_vis(self):
+    def update_vis(self, patch=None):
         """
-        :return:
+        :param patch: the patch of this ant drawn in a previous frame, None if it has not been drawn yet
+        :return: the updated patch
         """
-        if not self._patch:
-            self._patch = patches.Rectangle(self.environment.grid_to_array(self.pos), 0.4, 0.4, linewidth=2,
-                                            edgecolor='k', facecolor='w', fill=True, zorder=2)
-            self.environment.ax.add_patch(self._patch)
+        if not patch:
+            import matplotlib.patches as patches
+
+            patch = patches.Rectangle(self.environment.grid_to_array(self.pos), 0.4, 0.4, linewidth=2,
+                                      edgecolor='k', facecolor='w', fill=True, zorder=2)
+            self.environment.ax.add_patch(patch)
         else:
             if self.carry_food:
-                self._patch.set_facecolor('g')
+                patch.set_facecolor('g')
             else:
-                self._patch.set_facecolor('w')
+                patch.set_facecolor('w')
             if not self.alive:
-                self._patch.set_facecolor('black')
+                patch.set_facecolor('black')
             pos = self.environment.grid_to_array(self.pos)
             pos = (pos[0] + (1 - self.size) / 2, pos[1] + (1 - self.size) / 2)
-            self._patch.set_xy(pos)
+            patch.set_xy(pos)
 
-        return self._patch
+        return patch
 
     def count_encounters(self):
         counter = 0
@@ -1,26 +1,11 @@
-from model import Environment
-import matplotlib.pyplot as plt
+from aggregate import ReplicaAggregator
+from dataset import SummaryTable
+from resultstore import ResultStore
 import numpy as np
-from tqdm import tqdm
-import seaborn as sns
-import pickle
-sns.set()
-
-
-def get_iterations(env, steps):
-
-    for iteration in range(steps):
-
-        # take a step
-        status = env.step()
-
-        if status == "ended":
-            break
-
-    return iteration
 
 
 def run_continuous(env, steps=1000):
+    from tqdm import tqdm
 
     nr_on_track = []
 
@@ -36,11 +21,16 @@ def run_continuous(env, steps=1000):
 
 
 def plot_ratio(env, steps):
+    import matplotlib.pyplot as plt
+
     nr_on_track = run_continuous(env, steps)
     plt.plot(np.arange(0, steps), nr_on_track)
 
 
 def showplot(pheromone_strengths, total, steps):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set()
 
     for values in total:
         plt.plot(np.arange(0, steps), values)
@@ -60,14 +50,18 @@ if __name__ == '__main__':
     n = 40
     pheromone_strengths = np.linspace(0.7, 2.7, num=n)
     loops = 30
+    store = ResultStore("data/results.sqlite")
+    table = SummaryTable("data/summaries")
 
-    total = []
+    summaries = []
     for value in pheromone_strengths:
-        averages = []
-        env = Environment(width=width, height=height, n_colonies=1, n_ants=30, n_obstacles=20, decay=0.99, sigma=0.12,
-                          moore=False, pheromone_strength=value)
-        nr_iterations = get_iterations(env, steps)
-        total.append(nr_iterations)
-
-    with open('data/plot_runs.pkl', 'wb') as f:
-        pickle.dump(total, f)
+        params = dict(width=width, height=height, n_colonies=1, n_ants=30, n_obstacles=20, decay=0.99, sigma=0.12,
+                      moore=False, pheromone_strength=value)
+
+        # replicas until the 95% interval of the mean is within 50 iterations, at most loops
+        aggregator = ReplicaAggregator(params, steps, store=store, target=50, max_replicas=loops)
+        summary = aggregator.run()
+        summaries.append(dict(summary, pheromone_strength=value))
+
+    table.append(summaries, steps=steps, seed=0, source="averageruns", width=width, height=height, n_colonies=1,
+                 n_ants=30, n_obstacles=20, decay=0.99, sigma=0.12, moore=False)
@@ -2,7 +2,6 @@ from mesa.time import RandomActivation
 from ant import Ant
 from mesa import Agent
 import numpy as np
-import matplotlib.patches as patches
 import itertools
 
 
@@ -21,6 +20,10 @@ class Colony(Agent):
         self.initial_food = initial_food
         self.birth = birth
         self.death = death
+
+        # Dead ants that can be reused for newborn ants
+        self._pool = []
+
         # Create agents
         self.add_ants(N)
 
@@ -49,8 +52,12 @@ class Colony(Agent):
         Adds N ants to this colony.
         :param N: integer value which specifies the nr of ants to add
         """
-        for i in range(N):
-            a = Ant(i, self, death=self.death)
+        for _ in range(N):
+            if self._pool:
+                a = self._pool.pop()
+                a.reset(self.environment.next_id())
+            else:
+                a = Ant(self.environment.next_id(), self, death=self.death)
             self.environment.grid.place_agent(a, a.pos)
             self.environment.schedule.add(a)
 
@@ -77,6 +84,8 @@ class Colony(Agent):
         :return:
         """
         if len(self._patches) == 0:
+            import matplotlib.patches as patches
+
             for x, y in itertools.product(np.arange(-self.radius, self.radius + 1),
                                           np.arange(-self.radius, self.radius + 1)):
                 pos = np.add(self.pos, (x, y))
@@ -93,6 +102,13 @@ class Colony(Agent):
         self.food_collected += food
 
 
+    def retire(self, ant):
+        """
+        Take a dead ant, which is already removed from the schedule and grid, back into the pool of this colony.
+        :param ant: class Ant
+        """
+        self._pool.append(ant)
+
     def ant_birth(self):
         chance = np.exp(-2*self.initial_food/self.food_stash)
         if np.random.random() <= chance:
@@ -0,0 +1,239 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Columns of the sweep dataset, parameters first, then the seed and the outcome of the run. A run is censored when it
+# reached the maximum number of time-steps, so its iteration is a lower bound of the convergence time. The iteration is
+# a float, since adaptive sweeps store the mean of replicas. The method tells how the iteration was obtained:
+# "simulation", "surrogate" for points a surrogate screened out (see sweep.screened), or "interpolation" for cells of
+# an adaptive sweep that were not simulated. censored is only known for simulations.
+COLUMNS = [("width", "int32"), ("height", "int32"), ("n_colonies", "int32"), ("n_ants", "int32"),
+           ("n_obstacles", "int32"), ("decay", "float64"), ("sigma", "float64"), ("strength", "float64"),
+           ("moore", "bool"), ("steps", "int32"), ("seed", "int64"), ("iteration", "float64"), ("censored", "bool"),
+           ("method", "string"), ("source", "string")]
+
+# The old pickled sweeps in data/ with their pheromone strength and maximum number of time-steps. The df_heatmapMP4
+# sweeps were written by getdata.py with steps=1300, the strengths of df_heatmap4 and df_heatmap10 are the ones
+# heatmap.ipynb plots them with, and df_heatmap7 has a strength column (None). Their longest runs took 1299 iterations,
+# so they also ran for 1300 time-steps. The strength of the other pickles is unknown, they are not imported.
+PICKLES = dict({"df_heatmap4.pkl": (15.0, 1300), "df_heatmap7.pkl": (None, 1300), "df_heatmap10.pkl": (1.0, 1300)},
+               **{"df_heatmapMP4{}.pkl".format(strength): (float(strength), 1300)
+                  for strength in np.concatenate((np.linspace(0.8, 2.5, 12), np.linspace(1, 15, 10)))})
+
+# Renamed from the arguments of Environment
+ALIASES = {"pheromone_strength": "strength"}
+
+
+def schema():
+    """
+    Returns the pyarrow schema of the dataset, see COLUMNS.
+    """
+    import pyarrow as pa
+
+    types = {"int32": pa.int32(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(),
+             "string": pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def rows(df, steps=None, seed=None, source=None, method="simulation", **params):
+    """
+    Bring a DataFrame of results (e.g. of getdata.plot2d) to the columns of the dataset. Parameters that are not a
+    column of df are taken from the keyword arguments, unknown ones are missing.
+    :param df: DataFrame with at least an iteration column
+    :param steps: int, maximum number of time-steps of the runs, used for censoring
+    :param seed: int, seed of the runs
+    :param source: str, where the rows come from, e.g. the name of a sweep
+    :param method: str, how the iterations were obtained if df has no method column
+    :return: DataFrame with the columns of COLUMNS
+    """
+    df = df.rename(columns=ALIASES)
+    params = {ALIASES.get(name, name): value for name, value in params.items()}
+    params.update(steps=steps, seed=seed, source=source, method=method)
+
+    result = pd.DataFrame(index=range(len(df)))
+    for name, _ in COLUMNS:
+        if name in df:
+            result[name] = df[name].to_numpy()
+        else:
+            result[name] = params.get(name)
+
+    if "censored" not in df:
+        if steps is None:
+            result["censored"] = None
+        else:
+            result["censored"] = (result["iteration"] >= result["steps"] - 1).where(result["method"] == "simulation",
+                                                                                    None)
+
+    return result
+
+
+class SweepDataset:
+    """
+    Results of all sweeps in one Parquet dataset, partitioned by pheromone strength (strength=<value>/ directories).
+    Every append writes new files, so several sweep workers can append at the same time. Reading is lazy: only the
+    requested columns and partitions are read from disk.
+
+        dataset = SweepDataset("data/sweeps")
+        dataset.append(plot2d(...), steps=1300, seed=0, source="getdata")
+        df = dataset.load(columns=["decay", "sigma", "iteration"], strengths=[1.0])
+    """
+    def __init__(self, path="data/sweeps"):
+        """
+        :param path: str, directory of the dataset
+        """
+        self.path = path
+
+    def append(self, df, **kwargs):
+        """
+        Append results to the dataset.
+        :param df: DataFrame of results, see rows for the keyword arguments
+        :return: int, number of appended rows
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = rows(df, **kwargs)
+        if not len(df):
+            return 0
+
+        assert df["strength"].notna().all(), "every row needs a pheromone strength, the dataset is partitioned by it"
+
+        table = pa.Table.from_pandas(df, schema=schema(), preserve_index=False)
+        pq.write_to_dataset(table, self.path, partition_cols=["strength"])
+
+        return len(df)
+
+    def dataset(self):
+        """
+        Returns the pyarrow Dataset, for queries that load cannot express.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        full = schema()
+        partitioning = ds.partitioning(pa.schema([full.field("strength")]), flavor="hive")
+        return ds.dataset(self.path, schema=full, format="parquet", partitioning=partitioning)
+
+    def strengths(self):
+        """
+        Returns the pheromone strengths in the dataset, read from the names of the partitions.
+        """
+        values = []
+        for name in os.listdir(self.path) if os.path.isdir(self.path) else []:
+            match = re.fullmatch(r"strength=(.+)", name)
+            if match:
+                try:
+                    values.append(float(match.group(1)))
+                except ValueError:
+                    values.append(np.nan)
+
+        return sorted(values)
+
+    def load(self, columns=None, strengths=None, where=None):
+        """
+        Read a part of the dataset.
+        :param columns: list of columns, None for all
+        :param strengths: list of pheromone strengths, None for all partitions
+        :param where: pyarrow.dataset expression to filter the rows with, e.g. ds.field("censored") == False
+        :return: DataFrame
+        """
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns or [name for name, _ in COLUMNS])
+
+        condition = where
+        if strengths is not None:
+            selected = ds.field("strength").isin([float(s) for s in strengths])
+            condition = selected if condition is None else condition & selected
+
+        return self.dataset().to_table(columns=columns, filter=condition).to_pandas()
+
+
+class SummaryTable:
+    """
+    Summaries of replicated parameter points (see aggregate.ReplicaAggregator.summary) in a Parquet dataset next to
+    the sweeps, one file per append. The columns are the parameters of the point, the steps, the seed of the first
+    replica and the source, followed by the statistics, e.g. "replicas" and "iteration mean".
+
+        summaries = SummaryTable("data/summaries")
+        summaries.append([dict(aggregator.run(), pheromone_strength=2.0)], steps=1500, seed=0, source="averageruns")
+    """
+    def __init__(self, path="data/summaries"):
+        """
+        :param path: str, directory of the table
+        """
+        self.path = path
+
+    def append(self, summaries, steps=None, seed=None, source=None, **params):
+        """
+        Append summaries to the table.
+        :param summaries: list of dicts or DataFrame, one row per parameter point
+        :param steps: int, maximum number of time-steps of the runs
+        :param seed: int, seed of the first replica
+        :param source: str, where the rows come from
+        :param params: parameters shared by all rows, the others are columns of summaries
+        :return: int, number of appended rows
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = pd.DataFrame(summaries).rename(columns=ALIASES)
+        if not len(df):
+            return 0
+
+        shared = {ALIASES.get(name, name): value for name, value in params.items()}
+        shared.update(steps=steps, seed=seed, source=source)
+        for position, (name, value) in enumerate(shared.items()):
+            df.insert(position, name, value)
+
+        pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False), self.path)
+
+        return len(df)
+
+    def load(self, columns=None, where=None):
+        """
+        Read a part of the table.
+        :param columns: list of columns, None for all
+        :param where: pyarrow.dataset expression to filter the rows with, e.g. ds.field("source") == "averageruns"
+        :return: DataFrame
+        """
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns)
+
+        return ds.dataset(self.path, format="parquet").to_table(columns=columns, filter=where).to_pandas()
+
+
+def import_pickles(dataset, pickles, directory="data"):
+    """
+    Append the DataFrames of old pickled sweeps to a dataset. The source column holds the name of the pickle, pickles
+    whose name is already a source in the dataset are skipped, so importing again adds nothing.
+    :param dataset: SweepDataset
+    :param pickles: dict of file name: (pheromone strength, maximum number of time-steps), see PICKLES. The strength is
+                    None for pickles with a strength column
+    :param directory: str, directory of the pickles
+    :return: int, number of imported rows
+    """
+    imported = set(dataset.load(columns=["source"])["source"])
+
+    total = 0
+    for name, (strength, steps) in sorted(pickles.items()):
+        if name in imported:
+            continue
+
+        df = pd.read_pickle(os.path.join(directory, name))
+        assert (strength is None) == ("strength" in df), \
+            "{} needs a strength, either as an argument or as a column".format(name)
+        assert steps is not None, "{} needs the maximum number of time-steps of its sweep".format(name)
+
+        total += dataset.append(df, steps=steps, source=name, pheromone_strength=strength)
+
+    return total
+
+
+if __name__ == '__main__':
+    dataset = SweepDataset("data/sweeps")
+    print("imported {} rows".format(import_pickles(dataset, PICKLES)))
@@ -1,5 +1,5 @@
 import numpy as np
-import matplotlib.patches as patches
+import world
 
 
 class FoodGrid:
@@ -24,16 +24,12 @@ class FoodGrid:
     def add_food(self, xy=None):
         """
         Adds food on the position specified by xy. If no xy is specified a 
-        random location is seleced that is not on a colony.
+        random location is seleced that is not on a colony or obstacle.
         :param xy: a tuple of integers (x, y)
         """
+        if not xy:
+            xy = world.sample_cells(world.free_mask(self.environment), 1)[0]
 
-        while not xy:
-            x = np.random.randint(0, self.width, 1)[0]
-            y = np.random.randint(0, self.height, 1)[0]
-
-            if not any([colony.on_colony((x, y)) for colony in self.environment.colonies]):
-                xy = (x, y)
         self.grid[xy] += 10000
 
     def get_food_pos(self):
@@ -48,6 +44,8 @@ class FoodGrid:
 
         :return:
         """
+        import matplotlib.patches as patches
+
         food_spots = [self.environment.grid_to_array(
             pos) for pos in self.get_food_pos()]
 
@@ -1,26 +1,17 @@
-from model import Environment
-import matplotlib.pyplot as plt
+from dataset import SweepDataset
+from resultstore import ResultStore
+from sweep import run_point, screened
+from surrogate import MeanField
+from tuner import AutoTuner
 import numpy as np
-from tqdm import tqdm
-import seaborn as sns
 import pandas as pd
-sns.set()
-
-
-def get_iterations(env, steps):
-
-    for iteration in range(steps):
-
-        # take a step
-        status = env.step()
-
-        if status == "ended":
-            break
-
-    return iteration
 
 
 def showplot(pheromone_strengths):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set()
+
     plt.xlabel("Time")
     plt.ylabel("Number of ants on track")
     plt.title("Convergence behavior of ants (n=30)")
@@ -28,8 +19,9 @@ def showplot(pheromone_strengths):
     plt.show()
 
 
-def plot3d(width, height, steps, n, decays, sigmas, pheromone_strength):
-    df = pd.DataFrame(columns=["decay", "sigma", "strength", "iteration"])
+def plot3d(width, height, steps, n, decays, sigmas, pheromone_strength, store=None, seed=0, surrogate=None,
+           tuner=None):
+    df = pd.DataFrame(columns=["decay", "sigma", "strength", "iteration", "method"])
     row = 0
     decay = 0
 
@@ -37,30 +29,36 @@ def plot3d(width, height, steps, n, decays, sigmas, pheromone_strength):
         for sigma in sigmas:
             for strength in pheromone_strength:
                 print(decay, sigma, strength)
-                env = Environment(width=width, height=height, n_colonies=1,
-                                  n_ants=30, n_obstacles=10, decay=decay, sigma=sigma,
-                                  moore=False, pheromone_strength=strength)
+                params = dict(width=width, height=height, n_colonies=1,
+                              n_ants=30, n_obstacles=10, decay=decay, sigma=sigma,
+                              moore=False, pheromone_strength=strength)
 
-                iter = get_iterations(env, steps)
-                df.loc[row] = [decay, sigma, strength, iter]
+                if screened(params, surrogate):
+                    iter, method = steps - 1, "surrogate"
+                else:
+                    iter, method = run_point(params, steps, seed, store, tuner), "simulation"
+                df.loc[row] = [decay, sigma, strength, iter, method]
                 row += 1
             decay += 1
     return df
 
 
-def plot2d(width, height, steps, n, decays, sigmas, strength):
-    df = pd.DataFrame(columns=["decay", "sigma", "iteration"])
+def plot2d(width, height, steps, n, decays, sigmas, strength, store=None, seed=0, surrogate=None, tuner=None):
+    df = pd.DataFrame(columns=["decay", "sigma", "iteration", "method"])
     row = 0
 
     for decay in decays:
         for sigma in sigmas:
             print(decay, sigma)
-            env = Environment(width=width, height=height, n_colonies=1,
-                              n_ants=30, n_obstacles=10, decay=decay, sigma=sigma,
-                              moore=False, pheromone_strength=strength)
-
-            iter = get_iterations(env, steps)
-            df.loc[row] = [decay, sigma, iter]
+            params = dict(width=width, height=height, n_colonies=1,
+                          n_ants=30, n_obstacles=10, decay=decay, sigma=sigma,
+                          moore=False, pheromone_strength=strength)
+
+            if screened(params, surrogate):
+                iter, method = steps - 1, "surrogate"
+            else:
+                iter, method = run_point(params, steps, seed, store, tuner), "simulation"
+            df.loc[row] = [decay, sigma, iter, method]
             row += 1
     return df
 
@@ -74,7 +72,19 @@ if __name__ == '__main__':
     sigmas = np.linspace(0.01, 0.6, num=n)
     pheromone_strengths = np.linspace(0.8, 2.5, num=n)
 
+    # finished points are read from the store, so an interrupted or extended sweep continues where it was
+    store = ResultStore("./data/results.sqlite")
+    dataset = SweepDataset("./data/sweeps")
+
+    # set screen to skip the points that the mean-field model rules out, their rows get the method "surrogate"
+    screen = False
+    surrogate = MeanField(width, height, n_ants=30) if screen else None
+
+    # the execution options are calibrated once for this grid and cached in data/tuning.json
+    tuner = AutoTuner("./data/tuning.json")
+
     for strength in pheromone_strengths:
-        df = plot2d(width, height, steps, n, decays, sigmas, strength)
+        df = plot2d(width, height, steps, n, decays, sigmas, strength, store, surrogate=surrogate, tuner=tuner)
         # df = plot3d(width, height, steps, n, decays, sigmas, pheromone_strengths)
-        df.to_pickle("./data/df_heatmapMP4" + str(strength) + ".pkl")
+        dataset.append(df, steps=steps, seed=0, source="getdata", width=width, height=height, n_colonies=1,
+                       n_ants=30, n_obstacles=10, moore=False, pheromone_strength=strength)
@@ -0,0 +1,33 @@
+from mesa.space import MultiGrid
+import random
+
+
+class SetMultiGrid(MultiGrid):
+    """
+    A MultiGrid that keeps its empty cells in a set instead of a list. Mesa scans the list on every placement and move
+    of an agent, which makes building and running large worlds proportional to the number of cells.
+    """
+    def __init__(self, width, height, torus):
+        super().__init__(width, height, torus)
+
+        self.empties = set(self.empties)
+
+    def _place_agent(self, pos, agent):
+        """ Place the agent at the correct location. """
+        x, y = pos
+        self.grid[x][y].add(agent)
+        self.empties.discard(pos)
+
+    def _remove_agent(self, pos, agent):
+        """ Remove the agent from the given location. """
+        x, y = pos
+        self.grid[x][y].remove(agent)
+        if not self.grid[x][y]:
+            self.empties.add(pos)
+
+    def find_empty(self):
+        """ Pick a random empty cell, returns None if there is none. """
+        if self.exists_empty_cells():
+            return random.choice(sorted(self.empties))
+
+        return None
@@ -5,8 +5,33 @@ np.warnings.filterwarnings('ignore')
 
 
 def min_path_length(model):
-    return np.nanmin([np.nanmin(ant.path_lengths) for ant in model.schedule.agents])
+    return model.min_path_length
 
 
 def mean_min_path_length(model):
-    return np.nanmean([np.nanmin(ant.path_lengths) for ant in model.schedule.agents])
+    if model.path_count == 0:
+        return np.nan
+
+    return model.path_sum / model.path_count
+
+
+def record_trip(model, ant, length):
+    """
+    Update the path metrics of an ant and of the model when the ant finds food, called by Ant.check_food. The model
+    keeps the shortest path of all ants and the sum and count of the shortest path per ant, so the metrics cost O(1) per
+    trip instead of a scan of all path lengths per time-step. Ants that die or are reused keep their contribution.
+    :param model: class Environment
+    :param ant: class Ant
+    :param length: int, length of the path of the trip
+    """
+    if ant.trips == 0:
+        model.path_sum += length
+        model.path_count += 1
+        ant.min_path_length = length
+    elif length < ant.min_path_length:
+        model.path_sum += length - ant.min_path_length
+        ant.min_path_length = length
+
+    ant.trips += 1
+    if not length >= model.min_path_length:
+        model.min_path_length = length
@@ -1,23 +1,30 @@
 from mesa import Model
 from mesa.time import RandomActivation
-from mesa.space import MultiGrid
+from scheduler import EventActivation
+from grid import SetMultiGrid
 from colony import Colony
 from obstacle import Obstacle
 from food import FoodGrid
-from mesa.datacollection import DataCollector
 import metrics
+import world
+import trails
+import diffusion
 import numpy as np
 import random
-from scipy.ndimage import gaussian_filter
-from scipy.spatial import distance
 from ant import Ant
 from copy import copy
 
+# Bump whenever a change alters the outcome of a simulation, so cached sweep results are recomputed
+MODEL_VERSION = 3
+
 
 class Environment(Model):
     """ A model which contains a number of ant colonies. """
     def __init__(self, width, height, n_colonies, n_ants, n_obstacles, decay=0.2,
-                 sigma=0.1, moore=False, birth=True, death=True, pheromone_strength=10):
+                 sigma=0.1, moore=False, birth=True, death=True, pheromone_strength=10,
+                 event_driven=False, compact_interval=50, collect=True, terrain=None, random_colonies=False,
+                 recorder=None, coarse_steps=1, threads=1, bounded=False, max_history=None,
+                 dtype=np.float64, seed=None):
         """
         :param width: int, width of the system
         :param height: int, height of the system
@@ -26,22 +33,51 @@ class Environment(Model):
         :param decay: float, the rate in which the pheromone decays
         :param sigma: float, sigma of the Gaussian convolution
         :param moore: boolean, True/False whether Moore/vonNeumann is used
+        :param event_driven: boolean, True if only ants that act in a time-step are activated (see EventActivation)
+        :param compact_interval: int, number of time-steps between removals of dead ants from the schedule and grid, 0
+                                 or None to never remove them
+        :param collect: boolean, False to run without a DataCollector, which avoids importing pandas in headless runs
+        :param terrain: array of obstacle costs of shape (width, height) or the path of a terrain file (see
+                        world.load_terrain), cells with a non-zero cost get an obstacle besides the n_obstacles random ones.
+                        Ants can't enter cells with a negative cost, and stall for cost time-steps on the others
+        :param random_colonies: boolean, True to place the colonies on random free cells instead of in the centre
+        :param recorder: a recorder (FieldRecorder, AntLog) or list of recorders, that store the state of the model
+                         after every time-step
+        :param coarse_steps: int, number of time-steps k between pheromone updates. With k > 1 deposits are gathered
+                             and diffused and decayed for k steps at once (see diffusion.fused_step), ants move on the
+                             field of the last update in between. Run diffusion.py for the accuracy of this trade-off
+        :param threads: int, number of threads of the pheromone diffusion, see diffusion.TiledFilter. The result does not
+                        depend on it, more threads only pay off on large grids
+        :param bounded: boolean, True for very long runs in constant memory: ants keep their shortest path and number of
+                        trips instead of all path lengths, and max_history defaults to 2 * (width + height). Combine it
+                        with collect=False, the DataCollector stores every time-step
+        :param max_history: int, maximum length (>= 2) of the path an ant remembers. An ant whose path reaches it turns
+                            back to the colony along its path, like an ant that runs low on energy. None for no limit
+        :param dtype: float type of the pheromone field, np.float32 halves its memory and bandwidth on large grids at
+                      the cost of precision
+        :param seed: int, seed of the random generators of numpy and random, which mesa seeds from the system when it is
+                     None. Runs with the same seed and options are identical
         """
-        super().__init__()
+        super().__init__(seed)
 
         # Agent variables
         self.birth = birth
         self.death = death
+        self.compact_interval = compact_interval
+        self.current_id = 0
+        self.bounded = bounded
+        self.max_history = 2 * (width + height) if bounded and max_history is None else max_history
 
         self.pheromone_level = 1
         self.pheromone_strength = pheromone_strength
         self.nr_on_track = 0
+        self.recorders = list(recorder) if isinstance(recorder, (list, tuple)) else [recorder] if recorder else []
 
         # Environment variables
         self.n_ants = n_ants
         self.width = width
         self.height = height
-        self.grid = MultiGrid(width, height, False)
+        self.grid = SetMultiGrid(width, height, False)
 
         self.moore = moore
 
@@ -49,32 +85,64 @@ class Environment(Model):
         self.decay = decay
 
         # Environment attributes
-        self.schedule = RandomActivation(self)
+        if event_driven:
+            self.schedule = EventActivation(self)
+        else:
+            self.schedule = RandomActivation(self)
+
+        if isinstance(terrain, str):
+            terrain = world.load_terrain(terrain, width, height)
+
+        if random_colonies:
+            free = np.ones((width, height), dtype=bool) if terrain is None else terrain == 0
+            colony_positions = world.sample_cells(free, n_colonies)
+        else:
+            colony_positions = [(width // 2, height // 2)] * n_colonies
 
-        self.colonies = [Colony(self, i, (width // 2, height // 2), n_ants, birth=self.birth, death=self.death) for i in range(n_colonies)]
+        self.colonies = [Colony(self, i, pos, n_ants, birth=self.birth, death=self.death)
+                         for i, pos in enumerate(colony_positions)]
 
-        self.pheromones = np.zeros((width, height), dtype=np.float)
+        self.obstacles = []
+        if terrain is not None:
+            x, y = np.nonzero((terrain != 0) & ~world.colony_mask(self))
+            for pos in zip(x.tolist(), y.tolist()):
+                self.obstacles.append(Obstacle(self, pos, cost=terrain[pos]))
+
+        self.dtype = np.dtype(dtype)
+        self.pheromones = np.zeros((width, height), dtype=self.dtype)
         self.pheromone_updates = []
         self.found_pheromone = False
 
+        self.coarse_steps = coarse_steps
+        self.blur = diffusion.TiledFilter(threads)
+        self.deposits = np.zeros((width, height), dtype=self.dtype)
+        self.pending_steps = 0
+
         self.food = FoodGrid(self)
         self.food.add_food()
 
-        self.obstacles = []
-        for _ in range(n_obstacles):
-            self.obstacles.append(Obstacle(self))
+        for pos in world.sample_cells(world.free_mask(self), n_obstacles):
+            self.obstacles.append(Obstacle(self, pos))
 
-        # Metric + data collection
-        self.min_distance = distance.cityblock(self.colonies[0].pos, self.food.get_food_pos()[0])
-        self.datacollector = DataCollector(
-            model_reporters={"Minimum path length": metrics.min_path_length,
-                             "Mean minimum path length": metrics.mean_min_path_length},
-            agent_reporters={"Agent minimum path length": lambda x: min(x.path_lengths),
-                            "Encounters": Ant.count_encounters})
+        # Metric + data collection, updated on every trip by metrics.record_trip
+        self.min_path_length = np.nan
+        self.path_sum = 0
+        self.path_count = 0
+        self.min_distance = int(np.sum(np.abs(np.subtract(self.colonies[0].pos, self.food.get_food_pos()[0]))))
+        self.datacollector = None
+        if collect:
+            from mesa.datacollection import DataCollector
+
+            self.datacollector = DataCollector(
+                model_reporters={"Minimum path length": metrics.min_path_length,
+                                 "Mean minimum path length": metrics.mean_min_path_length},
+                agent_reporters={"Agent minimum path length": lambda x: x.min_path_length,
+                                "Encounters": Ant.count_encounters})
 
         # Animation attributes
         self.pheromone_im = None
         self.ax = None
+        self.ant_patches = {}
 
     def step(self):
         """
@@ -82,20 +150,57 @@ class Environment(Model):
         are updated per colony in random order.
         """
         self.food.step()
-        self.datacollector.collect(self)
+        if self.datacollector:
+            self.datacollector.collect(self)
 
         # Update all colonies
         for col in random.sample(self.colonies, len(self.colonies)):
             col.step()
 
         self.schedule.step()
-        self.update_pheromones()
+        if self.compact_interval and self.schedule.steps % self.compact_interval == 0:
+            self.compact()
+
+        if self.coarse_steps > 1:
+            self.update_pheromones_coarse()
+        else:
+            self.update_pheromones()
+
+        for recorder in self.recorders:
+            recorder.record(self)
+
         if not self.check_exit():
             return "ended"
         else:
             return "running"
 
 
+    def next_id(self):
+        """
+        Returns a new unique id for an ant. The Model of mesa 0.8.2 has no next_id, later versions provide the same.
+        """
+        self.current_id += 1
+        return self.current_id
+
+    def compact(self):
+        """
+        Remove the dead ants from the schedule and the grid. The ants are handed back to their colony to be reused for
+        births, their path lengths stay in the metrics of the model.
+        """
+        dead = [ant for ant in self.schedule.agents if not ant.alive]
+        if not dead:
+            return
+
+        self.schedule.agents = [ant for ant in self.schedule.agents if ant.alive]
+
+        for ant in dead:
+            self.grid.remove_agent(ant)
+            ant.colony.retire(ant)
+
+            patch = self.ant_patches.pop(ant, None)
+            if patch:
+                patch.remove()
+
     def check_exit(self):
         # print(self.pheromones, self.found_pheromone)
 
@@ -186,7 +291,8 @@ class Environment(Model):
         :return:
         """
         indices = self.grid.get_neighborhood(pos, self.moore)
-        indices = [x for x in indices if not any([isinstance(x, Obstacle) for x in self.grid[x[0]][x[1]]])]
+        indices = [x for x in indices
+                   if all(obstacle.passable for obstacle in self.grid[x[0]][x[1]] if isinstance(obstacle, Obstacle))]
 
         pheromones = [self.pheromones[x, y] for x, y in indices]
 
@@ -203,7 +309,23 @@ class Environment(Model):
         self.pheromone_updates = []
 
         # gaussian convolution using self.sigma
-        self.pheromones = gaussian_filter(self.pheromones, self.sigma) * self.decay
+        self.pheromones = (self.blur(self.pheromones, self.sigma) * self.decay).astype(self.dtype, copy=False)
+
+    def update_pheromones_coarse(self):
+        """
+        Gather the pheromones of this time-step, and every coarse_steps time-steps integrate them in one fused step.
+        """
+        for (pos, level) in self.pheromone_updates:
+            self.deposits[pos] += self.pheromone_strength
+
+        self.pheromone_updates = []
+        self.pending_steps += 1
+
+        if self.pending_steps == self.coarse_steps:
+            self.pheromones = diffusion.fused_step(self.pheromones, self.deposits, self.sigma, self.decay,
+                                                   self.coarse_steps, self.blur).astype(self.dtype, copy=False)
+            self.deposits[:] = 0
+            self.pending_steps = 0
 
 
     def animate(self, ax):
@@ -253,7 +375,7 @@ class Environment(Model):
         Update the visualization part of the Ants.
         """
         for ant in self.schedule.agents:
-            ant.update_vis()
+            self.ant_patches[ant] = ant.update_vis(self.ant_patches.get(ant))
 
     def animate_obstacles(self):
         """
@@ -278,6 +400,13 @@ class Environment(Model):
 
         return list(zip(pher_above_thres[0],pher_above_thres[1]))
 
+    def bottleneck_paths(self):
+        """
+        Returns for every colony and food source the critical pheromone threshold at which they are connected and the
+        path that realises it, in a single pass instead of a find_path per threshold (see trails.bottleneck_paths).
+        """
+        return trails.bottleneck_paths(self)
+
     def find_path(self, pher_above_thres):
         """ Returns the shortest paths from all the colonies to all the food sources.
         A path can only use the positions in the given array. Therefore, this function
@@ -1,6 +1,6 @@
 from mesa import Agent
 import numpy as np
-import matplotlib.patches as patches
+import world
 
 class Obstacle(Agent):
     """An obstacle kind of agent."""
@@ -11,13 +11,9 @@ class Obstacle(Agent):
         self.cost = cost
         self._patch = None
 
-        # make sure that obstacle can't be at same place as food or colony
-        # TODO: obstacle should not be placed on colony or obstacle itself
+        # make sure that obstacle can't be at same place as food, a colony or another obstacle
         if pos == None:
-            pos = self.environment.get_random_position()
-
-            while(self.environment.position_taken(pos)):
-                pos = self.environment.get_random_position()
+            pos = world.sample_cells(world.free_mask(self.environment), 1)[0]
 
         self.pos = pos
 
@@ -39,6 +35,8 @@ class Obstacle(Agent):
     def update_vis(self):
         radius = 0.4
         if not self._patch:
+            import matplotlib.patches as patches
+
             self._patch = patches.Circle(self.environment.grid_to_array(self.pos), radius, linewidth=2,
                                          edgecolor='y', facecolor='y', fill=True, zorder=1)
             self.environment.ax.add_patch(self._patch)
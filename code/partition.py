@@ -0,0 +1,732 @@
+from mesa.time import RandomActivation
+from multiprocessing import shared_memory
+from ant import Ant
+from colony import Colony
+from obstacle import Obstacle
+from pathbuffer import PathBuffer
+import multiprocessing
+import threading
+import diffusion
+import numpy as np
+import pickle
+import random
+import os
+import world
+from scipy.ndimage import gaussian_filter
+
+# Commands of the coordinator to the workers
+STOP = 0
+STEP = 1
+METRICS = 2
+
+# Columns of the statistics every worker reports after a step
+STATS = ("ants", "food cells", "max pheromone", "min path length", "path sum", "path count")
+
+
+def split(width, height, n):
+    """
+    Returns the number of tiles (along x, along y) for n subdomains, the factorization of n with the shortest total
+    boundary, which is the amount of halo that is exchanged.
+    :return: tuple (int, int)
+    """
+    factors = [(nx, n // nx) for nx in range(1, n + 1) if n % nx == 0 and nx <= width and n // nx <= height]
+    assert factors, "can't split a {}x{} grid in {} subdomains".format(width, height, n)
+
+    return min(factors, key=lambda tiles: tiles[0] * height + tiles[1] * width)
+
+
+class Decomposition:
+    """ A split of the grid into rectangular subdomains, numbered along y first. """
+    def __init__(self, width, height, tiles):
+        """
+        :param tiles: tuple (int, int), number of subdomains along x and along y
+        """
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+        self.xs = np.linspace(0, width, tiles[0] + 1).astype(int)
+        self.ys = np.linspace(0, height, tiles[1] + 1).astype(int)
+
+    def __len__(self):
+        return self.tiles[0] * self.tiles[1]
+
+    def owner(self, x, y):
+        """
+        Returns the index of the subdomain that owns the cells (x, y), x and y can be arrays.
+        """
+        i = np.searchsorted(self.xs, x, side="right") - 1
+        j = np.searchsorted(self.ys, y, side="right") - 1
+        return i * self.tiles[1] + j
+
+    def bounds(self, index, halo=0):
+        """
+        Returns the cells of a subdomain extended by halo cells on each side, clipped to the grid.
+        :return: tuple of slices (x, y)
+        """
+        i, j = divmod(index, self.tiles[1])
+        return (slice(max(self.xs[i] - halo, 0), min(self.xs[i + 1] + halo, self.width)),
+                slice(max(self.ys[j] - halo, 0), min(self.ys[j + 1] + halo, self.height)))
+
+
+class SharedArrays:
+    """
+    Named numpy arrays in shared memory. The coordinator creates them, workers attach to them by name, so every process
+    sees the whole field without copying it.
+    """
+    def __init__(self, specs, names=None):
+        """
+        :param specs: dict of name: (shape, dtype)
+        :param names: dict of name: shared memory name to attach to, None to create the arrays
+        """
+        self.specs = specs
+        self.blocks = {}
+        self.arrays = {}
+
+        for name, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            if names is None:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=names[name])
+
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            if names is None:
+                self.arrays[name][...] = 0
+
+    @property
+    def names(self):
+        return {name: block.name for name, block in self.blocks.items()}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+class Mailbox:
+    """
+    The outgoing messages of a worker in a shared byte array: a table of (destination, offset, length) followed by the
+    pickled messages. Every worker writes only its own mailbox and reads those of its neighbours.
+    """
+    def __init__(self, buffer, n_workers):
+        self.buffer = buffer
+        self.table = np.ndarray((1 + 3 * n_workers,), dtype=np.int64, buffer=buffer)
+        self.start = self.table.nbytes
+
+    def post(self, messages):
+        """
+        Replace the contents of the mailbox.
+        :param messages: dict of destination: message
+        """
+        offset = self.start
+        self.table[0] = len(messages)
+        for i, (destination, message) in enumerate(messages.items()):
+            data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+            if offset + len(data) > len(self.buffer):
+                raise MemoryError("the messages of a step don't fit in the mailbox, increase mailbox_size")
+
+            self.buffer[offset:offset + len(data)] = data
+            self.table[1 + 3 * i:4 + 3 * i] = destination, offset, len(data)
+            offset += len(data)
+
+    def read(self, destination):
+        """
+        Returns the message for a destination, or None if there is none.
+        """
+        for i in range(int(self.table[0])):
+            target, offset, length = self.table[1 + 3 * i:4 + 3 * i]
+            if target == destination:
+                return pickle.loads(bytes(self.buffer[offset:offset + length]))
+
+        return None
+
+
+class SlabField:
+    """
+    A private copy of a part of a field, indexed with the global (x, y) positions that the ants use.
+    """
+    def __init__(self, array, bounds):
+        self.origin = (bounds[0].start, bounds[1].start)
+        self.array = array
+
+    def __getitem__(self, pos):
+        return self.array[pos[0] - self.origin[0], pos[1] - self.origin[1]]
+
+    def __setitem__(self, pos, value):
+        self.array[pos[0] - self.origin[0], pos[1] - self.origin[1]] = value
+
+
+class SlabFood:
+    """ Stands in for the FoodGrid of the Environment in a subdomain. """
+    def __init__(self, array, bounds):
+        self.grid = SlabField(array, bounds)
+
+
+class SlabGrid:
+    """
+    Stands in for the MultiGrid of the Environment in a subdomain. Only obstacles are stored per cell, the positions
+    of the ants are kept by the ants themselves.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = {}
+
+    def __getitem__(self, x):
+        return _Column(self.cells, x)
+
+    def place_agent(self, agent, pos):
+        agent.pos = pos
+        if isinstance(agent, Obstacle):
+            self.cells.setdefault(pos, []).append(agent)
+
+    def remove_agent(self, agent):
+        pass
+
+    def get_neighborhood(self, pos, moore, include_center=False, radius=1):
+        """ The neighbourhood of a cell, in the same order as mesa's non-toroidal grids. """
+        x, y = pos
+        cells = []
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                if (dx == 0 and dy == 0 and not include_center) or (not moore and dx != 0 and dy != 0):
+                    continue
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
+                    cells.append((x + dx, y + dy))
+
+        return cells
+
+
+class _Column:
+    def __init__(self, cells, x):
+        self.cells = cells
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.cells.get((self.x, y), ())
+
+
+class SlabColony(Colony):
+    """
+    A colony as seen by one subdomain. Its food stash is shared by all subdomains: the stash of the last step boundary
+    plus the changes of this subdomain, which the coordinator adds up after every step. Only the subdomain that owns the
+    position of the colony gives birth to ants.
+    """
+    def __init__(self, subdomain, pheromone_id, pos, n_ants, owner, birth=True, death=True):
+        self.environment = subdomain
+        self.pheromone_id = pheromone_id
+        self.pos = pos
+        self.num_agents = n_ants if owner else 0
+        self._radius = 1
+        self.food_collected = 0
+        self.initial_food = 1000
+        self.birth = birth and owner
+        self.death = death
+        self._pool = []
+        self._patches = []
+
+        if owner:
+            self.add_ants(n_ants)
+
+    @property
+    def food_stash(self):
+        environment = self.environment
+        return float(environment.stash[self.pheromone_id] + environment.stash_changes[self.pheromone_id])
+
+    @food_stash.setter
+    def food_stash(self, value):
+        environment = self.environment
+        environment.stash_changes[self.pheromone_id] = value - environment.stash[self.pheromone_id]
+
+    def retire(self, ant):
+        """
+        Pool a dead ant for reuse if this subdomain gives birth to ants of the colony, drop it otherwise. A pool that
+        is never drained would grow with every ant that dies away from the colony.
+        :param ant: class Ant
+        """
+        if self.birth:
+            self._pool.append(ant)
+
+
+class Subdomain:
+    """
+    The part of a PartitionedEnvironment that one worker process owns. It acts as the environment of its ants, which
+    are the unchanged Ant agents, so they follow the same rules as in the Environment. During the ant phase they read
+    the pheromones of the last step boundary and a private copy of the food around the subdomain. Afterwards ants that
+    left the subdomain, and their deposits and food pickups outside it, are posted to the owning neighbour.
+    """
+    def __init__(self, index, config, shared, mailboxes):
+        self.index = index
+        self.width = config["width"]
+        self.height = config["height"]
+        self.moore = config["moore"]
+        self.sigma = config["sigma"]
+        self.decay = config["decay"]
+        self.pheromone_strength = config["pheromone_strength"]
+        self.compact_interval = config["compact_interval"]
+        self.bounded = config["bounded"]
+        self.max_history = config["max_history"]
+        self.decomposition = Decomposition(self.width, self.height, config["tiles"])
+
+        self.pheromones = shared["pheromones"]
+        self.staged = shared["staged"]
+        self.shared_food = shared["food"]
+        self.costs = shared["costs"]
+        self.stash = shared["stash"]
+        self.stash_changes = shared["stash_changes"][index]
+        self.stats = shared["stats"][index]
+        self.mailboxes = mailboxes
+
+        # the subdomain itself, the cells ants can reach in a step and the cells the diffusion reads
+        self.interior = self.decomposition.bounds(index)
+        self.reach = self.decomposition.bounds(index, 1)
+        self.halo = self.decomposition.bounds(index, diffusion.halo_width(self.sigma))
+
+        x, y = np.indices((self.reach[0].stop - self.reach[0].start, self.reach[1].stop - self.reach[1].start))
+        self.reach_owner = self.decomposition.owner(x + self.reach[0].start, y + self.reach[1].start)
+        self.neighbours = [n for n in np.unique(self.reach_owner).tolist() if n != index]
+
+        self.grid = SlabGrid(self.width, self.height)
+        self.schedule = RandomActivation(self)
+        self.food = SlabFood(np.zeros(self.reach_owner.shape), self.reach)
+        self.deposits = np.zeros(self.reach_owner.shape)
+        self.current_id = index
+        self.min_path_length = np.nan
+        self.path_sum = 0
+        self.path_count = 0
+
+        for x, y in zip(*np.nonzero(self.costs[self.reach])):
+            pos = (int(x) + self.reach[0].start, int(y) + self.reach[1].start)
+            Obstacle(self, pos, cost=float(self.costs[pos]))
+
+        self.colonies = [SlabColony(self, i, tuple(pos), config["n_ants"],
+                                    owner=self.owns(pos), birth=config["birth"], death=config["death"])
+                         for i, pos in enumerate(config["colonies"])]
+
+    def owns(self, pos):
+        return self.interior[0].start <= pos[0] < self.interior[0].stop and \
+               self.interior[1].start <= pos[1] < self.interior[1].stop
+
+    def next_id(self):
+        """
+        Returns a new unique id for an ant, ids are unique over all subdomains.
+        """
+        self.current_id += len(self.decomposition)
+        return self.current_id
+
+    def move_agent(self, ant, pos):
+        assert abs(pos[0] - ant.pos[0]) <= 1 and abs(pos[1] - ant.pos[1]) <= 1, \
+            "the ant can't move from its original position {} to the new position {}".format(ant.pos, pos)
+
+        ant.pos = pos
+
+    def place_pheromones(self, pos):
+        self.deposits[pos[0] - self.reach[0].start, pos[1] - self.reach[1].start] += self.pheromone_strength
+
+    def get_neighbor_pheromones(self, pos, id):
+        indices = [cell for cell in self.grid.get_neighborhood(pos, self.moore) if self.costs[cell] >= 0]
+        return indices, [self.pheromones[cell] for cell in indices]
+
+    def step_ants(self):
+        """
+        The ant phase of a time-step: births, the ants in random order, and the messages to the neighbours.
+        """
+        food = self.food.grid.array
+        food[...] = self.shared_food[self.reach]
+        before = food.copy()
+        self.deposits[...] = 0
+
+        for colony in random.sample(self.colonies, len(self.colonies)):
+            colony.step()
+
+        self.schedule.step()
+        if self.compact_interval and self.schedule.steps % self.compact_interval == 0:
+            self.compact()
+
+        # ants that left the subdomain, with the deposits and food changes outside it, go to the owner
+        messages = {n: {"ants": [], "deposits": None, "food": None} for n in self.neighbours}
+        staying = []
+        for ant in self.schedule.agents:
+            if self.owns(ant.pos):
+                staying.append(ant)
+            else:
+                messages[int(self.decomposition.owner(*ant.pos))]["ants"].append(pack(ant))
+        self.schedule.agents = staying
+
+        origin = np.array([self.reach[0].start, self.reach[1].start])
+        for name, changes in (("deposits", self.deposits), ("food", food - before)):
+            for n in self.neighbours:
+                cells = np.argwhere((self.reach_owner == n) & (changes != 0))
+                if len(cells):
+                    messages[n][name] = (cells + origin, changes[tuple(cells.T)])
+
+        self.mailboxes[self.index].post(messages)
+
+    def receive(self):
+        """
+        The exchange phase of a time-step: take in the ants and changes of the neighbours, and stage the pheromones of
+        the subdomain with their deposits for the diffusion.
+        """
+        interior = (slice(self.interior[0].start - self.reach[0].start, self.interior[0].stop - self.reach[0].start),
+                    slice(self.interior[1].start - self.reach[1].start, self.interior[1].stop - self.reach[1].start))
+        food = self.food.grid.array[interior]
+        deposits = self.deposits[interior]
+
+        origin = np.array([self.interior[0].start, self.interior[1].start])
+        for n in self.neighbours:
+            message = self.mailboxes[n].read(self.index)
+            if message is None:
+                continue
+
+            for state in message["ants"]:
+                self.schedule.add(unpack(state, self))
+            if message["deposits"] is not None:
+                cells, values = message["deposits"]
+                np.add.at(deposits, tuple((cells - origin).T), values)
+            if message["food"] is not None:
+                cells, values = message["food"]
+                np.add.at(food, tuple((cells - origin).T), values)
+
+        # ants of different subdomains may together take more food from a cell than there is in one step
+        np.clip(food, 0, None, out=food)
+        self.shared_food[self.interior] = food
+        self.staged[self.interior] = self.pheromones[self.interior] + deposits
+
+    def diffuse(self):
+        """
+        The diffusion phase of a time-step. The staged field is filtered with a halo as wide as the kernel, so the
+        subdomain gets exactly the values of a gaussian_filter of the whole field.
+        """
+        field = gaussian_filter(self.staged[self.halo], self.sigma)
+        x = self.interior[0].start - self.halo[0].start
+        y = self.interior[1].start - self.halo[1].start
+        self.pheromones[self.interior] = field[x:x + self.interior[0].stop - self.interior[0].start,
+                                               y:y + self.interior[1].stop - self.interior[1].start] * self.decay
+
+        self.stats[:3] = len(self.schedule.agents), np.count_nonzero(self.shared_food[self.interior] > 0), \
+            np.max(self.pheromones[self.interior], initial=0)
+
+    def report_metrics(self):
+        """
+        Store the path length metrics of the subdomain in its statistics, see PartitionedEnvironment.min_path_length.
+        """
+        self.stats[3:] = self.min_path_length, self.path_sum, self.path_count
+
+    def compact(self):
+        """
+        Remove the dead ants, see Environment.compact.
+        """
+        dead = [ant for ant in self.schedule.agents if not ant.alive]
+        self.schedule.agents = [ant for ant in self.schedule.agents if ant.alive]
+
+        for ant in dead:
+            ant.colony.retire(ant)
+
+
+# Attributes of an ant that are sent along when it moves to another subdomain
+STATE = ("unique_id", "death", "alive", "slowScore", "pos", "encounters", "return_to_colony", "carry_food",
+         "carry_capacity", "max_energy", "energy", "energy_consumption", "path_lengths", "min_path_length", "trips")
+
+
+def pack(ant):
+    """
+    Returns the state of an ant without its references to the subdomain it leaves.
+    """
+    return ant.colony.pheromone_id, [getattr(ant, name) for name in STATE], ant.history.toarray(), \
+        ant.last_steps.copy()
+
+
+def unpack(state, subdomain):
+    """
+    Returns the ant of a packed state in a subdomain, see pack.
+    """
+    colony, values, history, last_steps = state
+    colony = subdomain.colonies[colony]
+
+    ant = Ant.__new__(Ant)
+    ant.model = ant.environment = subdomain
+    ant.colony = colony
+    ant.pheromone_id = colony.pheromone_id
+    for name, value in zip(STATE, values):
+        setattr(ant, name, value)
+
+    ant.history = PathBuffer(ant.pos, capacity=max(len(history), 8), dtype=history.dtype)
+    ant.history.load(history)
+    ant.last_steps = last_steps
+
+    return ant
+
+
+def work(index, config, names, mailbox_names, barrier, seed):
+    """
+    The loop of a worker process, which waits at the barrier for the commands of the coordinator.
+    """
+    shared = SharedArrays(config["shared"], names)
+    blocks = [shared_memory.SharedMemory(name=name) for name in mailbox_names]
+    n_workers = len(mailbox_names)
+
+    try:
+        np.random.seed([seed, index])
+        random.seed(seed * n_workers + index)
+
+        mailboxes = [Mailbox(block.buf, n_workers) for block in blocks]
+        subdomain = Subdomain(index, config, shared, mailboxes)
+        control = shared["control"]
+
+        while True:
+            barrier.wait()
+            command = int(control[0])
+            if command == STOP:
+                break
+
+            if command == METRICS:
+                subdomain.report_metrics()
+            else:
+                subdomain.step_ants()
+                barrier.wait()
+                subdomain.receive()
+                barrier.wait()
+                subdomain.diffuse()
+
+            barrier.wait()
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        mailboxes = subdomain = None
+        shared.close()
+        for block in blocks:
+            block.close()
+
+
+class PartitionedEnvironment:
+    """
+    An Environment whose grid is split into rectangular subdomains, each owned by a worker process with its own ants
+    and its part of the pheromone and food fields, so large worlds use all cores. The fields live in shared memory.
+    Every time-step has three phases, separated by barriers, which follow the freeze-dry update of the Environment:
+
+    1. ants: every worker steps its ants on the pheromones of the last step boundary. Ants that left the subdomain, and
+       their deposits and food pickups outside it, are posted to the mailbox of the worker.
+    2. exchange: workers take in the ants and changes of their neighbours and stage pheromones plus deposits.
+    3. diffusion: workers filter their part of the staged field with a halo as wide as the kernel.
+
+    The coordinator adds food when it is gone and sums the changes of the colony stashes. Only the food and colony
+    stash of a single step are read from the last step boundary by ants in different subdomains. Animation, data
+    collection and the recorders of the Environment are not available. Use it as a context manager, or call close.
+    """
+    def __init__(self, width, height, n_colonies, n_ants, n_obstacles, decay=0.2, sigma=0.1, moore=False, birth=True,
+                 death=True, pheromone_strength=10, compact_interval=50, terrain=None, random_colonies=False,
+                 bounded=False, max_history=None, processes=None, tiles=None, mailbox_size=2 ** 22, seed=None):
+        """
+        See Environment for the parameters of the model.
+        :param processes: int, number of worker processes, the number of cores by default
+        :param tiles: tuple (int, int), number of subdomains along x and along y, see split by default
+        :param mailbox_size: int, number of bytes per worker for the ants and changes it sends in a step
+        :param seed: int, seed of the layout and the workers, drawn from numpy's global generator by default
+        """
+        if seed is not None:
+            np.random.seed(seed)
+        seed = int(np.random.randint(2 ** 31)) if seed is None else seed
+
+        tiles = tiles or split(width, height, processes or os.cpu_count())
+        self.decomposition = Decomposition(width, height, tiles)
+        n_workers = len(self.decomposition)
+
+        self.width = width
+        self.height = height
+        self.steps = 0
+        self.found_pheromone = False
+
+        specs = {"pheromones": ((width, height), np.float64), "staged": ((width, height), np.float64),
+                 "food": ((width, height), np.float64), "costs": ((width, height), np.float64),
+                 "stash": ((n_colonies,), np.float64), "stash_changes": ((n_workers, n_colonies), np.float64),
+                 "stats": ((n_workers, len(STATS)), np.float64), "control": ((1,), np.int64)}
+        self.shared = SharedArrays(specs)
+        self.mailboxes = [shared_memory.SharedMemory(create=True, size=mailbox_size) for _ in range(n_workers)]
+
+        colonies = self.place(n_colonies, n_obstacles, terrain, random_colonies)
+        self.shared["stash"][:] = 1000
+
+        config = dict(width=width, height=height, moore=moore, sigma=sigma, decay=decay, birth=birth, death=death,
+                      pheromone_strength=pheromone_strength, compact_interval=compact_interval, n_ants=n_ants,
+                      bounded=bounded,
+                      max_history=2 * (width + height) if bounded and max_history is None else max_history,
+                      tiles=tiles, colonies=colonies, shared=specs)
+
+        self.barrier = multiprocessing.Barrier(n_workers + 1)
+        self.workers = [multiprocessing.Process(target=work, args=(i, config, self.shared.names,
+                                                                   [block.name for block in self.mailboxes],
+                                                                   self.barrier, seed), daemon=True)
+                        for i in range(n_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def place(self, n_colonies, n_obstacles, terrain, random_colonies):
+        """
+        Place the colonies, obstacles and first food like the Environment, on arrays instead of a MultiGrid.
+        :return: list of colony positions
+        """
+        if isinstance(terrain, str):
+            terrain = world.load_terrain(terrain, self.width, self.height)
+
+        if random_colonies:
+            free = np.ones((self.width, self.height), dtype=bool) if terrain is None else terrain == 0
+            colonies = world.sample_cells(free, n_colonies)
+        else:
+            colonies = [(self.width // 2, self.height // 2)] * n_colonies
+
+        x, y = np.indices((self.width, self.height))
+        self.colony_mask = np.zeros((self.width, self.height), dtype=bool)
+        for pos in colonies:
+            self.colony_mask |= (x - pos[0]) ** 2 + (y - pos[1]) ** 2 <= 1
+
+        costs = self.shared["costs"]
+        if terrain is not None:
+            costs[...] = np.where(self.colony_mask, 0, terrain)
+
+        self.add_food()
+
+        # obstacles have a cost of -1 by default, the costs of terrain obstacles are non-zero
+        cells = world.sample_cells(self.free_mask(), n_obstacles)
+        if cells:
+            costs[tuple(np.array(cells).T)] = -1
+
+        return colonies
+
+    def free_mask(self):
+        return ~self.colony_mask & (self.shared["costs"] == 0) & (self.shared["food"] <= 0)
+
+    def add_food(self):
+        """
+        Add food on a random cell that is not occupied, see FoodGrid.add_food.
+        """
+        self.shared["food"][world.sample_cells(self.free_mask(), 1)[0]] += 10000
+
+    def step(self):
+        """
+        Do a single time-step in all workers.
+        """
+        stats = self.shared["stats"]
+        if self.steps == 0:
+            has_food = True
+        else:
+            has_food = np.sum(stats[:, STATS.index("food cells")]) > 0
+        if not has_food:
+            self.add_food()
+
+        self.command(STEP, phases=3)
+
+        self.shared["stash"][:] = np.clip(self.shared["stash"] + self.shared["stash_changes"].sum(axis=0), 0, None)
+        self.shared["stash_changes"][...] = 0
+        self.steps += 1
+
+        if not self.check_exit():
+            return "ended"
+        else:
+            return "running"
+
+    def command(self, command, phases=1):
+        """
+        Let the workers run a command, and wait until they are done.
+        :param phases: int, number of phases of the command, the workers wait at the barrier after each phase
+        """
+        self.shared["control"][0] = command
+        try:
+            for _ in range(phases + 1):
+                self.barrier.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError("a worker of the partitioned environment failed") from None
+
+    def check_exit(self):
+        """
+        See Environment.check_exit.
+        """
+        stats = self.shared["stats"]
+        if np.max(stats[:, STATS.index("max pheromone")]) > 1 and np.sum(stats[:, STATS.index("food cells")]) == 0:
+            self.found_pheromone = True
+            return True
+
+        return not self.found_pheromone
+
+    @property
+    def pheromones(self):
+        """ A copy of the pheromone field. """
+        return self.shared["pheromones"].copy()
+
+    @property
+    def food(self):
+        """ A copy of the food field. """
+        return self.shared["food"].copy()
+
+    @property
+    def n_agents(self):
+        """ The number of ants in all subdomains. """
+        return int(np.sum(self.shared["stats"][:, STATS.index("ants")]))
+
+    def min_path_length(self):
+        """
+        See metrics.min_path_length.
+        """
+        self.command(METRICS)
+        return np.nanmin(self.shared["stats"][:, STATS.index("min path length")])
+
+    def mean_min_path_length(self):
+        """
+        See metrics.mean_min_path_length.
+        """
+        self.command(METRICS)
+        stats = self.shared["stats"]
+        count = np.sum(stats[:, STATS.index("path count")])
+        return np.sum(stats[:, STATS.index("path sum")]) / count if count else np.nan
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+        """
+        if self.workers:
+            try:
+                self.command(STOP, phases=0)
+            except RuntimeError:
+                pass
+            for worker in self.workers:
+                worker.join(5)
+                if worker.is_alive():
+                    worker.terminate()
+            self.workers = []
+
+            self.shared.close(unlink=True)
+            for block in self.mailboxes:
+                block.close()
+                block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser("partition")
+    parser.add_argument("-size", "--size", help="int, width and height of the grid", type=int, default=1000)
+    parser.add_argument("-ants", "--ants", help="int, number of ants", type=int, default=10000)
+    parser.add_argument("-steps", "--steps", help="int, number of time-steps", type=int, default=100)
+    parser.add_argument("-processes", "--processes", help="int, number of worker processes", type=int, default=None)
+    args = parser.parse_args()
+
+    with PartitionedEnvironment(args.size, args.size, 1, args.ants, args.size, decay=0.99, sigma=0.5,
+                                pheromone_strength=2, processes=args.processes, seed=0) as env:
+        start = time.time()
+        for _ in range(args.steps):
+            env.step()
+        print("{} steps on {} subdomains in {:.1f}s, {} ants".format(args.steps, len(env.decomposition),
+                                                                     time.time() - start, env.n_agents))
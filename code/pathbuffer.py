@@ -0,0 +1,95 @@
+import numpy as np
+
+
+class PathBuffer:
+    """ A stack of grid positions stored in a small integer array, used as the path memory of an ant. """
+    __slots__ = ("_buffer", "_length")
+
+    def __init__(self, pos, capacity=8, dtype=np.int16):
+        """
+        :param pos: tuple (x, y), the first position of the path
+        :param capacity: int, initial number of positions that fit in the buffer
+        :param dtype: numpy integer type of the coordinates, int16 suffices for grids up to 32767 cells wide
+        """
+        self._buffer = np.empty((capacity, 2), dtype=dtype)
+        self.reset(pos)
+
+    def __len__(self):
+        return self._length
+
+    def reset(self, pos):
+        """
+        Forget the path and start again from pos.
+        :param pos: tuple (x, y)
+        """
+        self._buffer[0] = pos
+        self._length = 1
+
+    def append(self, pos):
+        """
+        Add a position to the end of the path, the buffer doubles in size when it is full.
+        :param pos: tuple (x, y)
+        """
+        if self._length == len(self._buffer):
+            buffer = np.empty((2 * len(self._buffer), 2), dtype=self._buffer.dtype)
+            buffer[:self._length] = self._buffer
+            self._buffer = buffer
+
+        self._buffer[self._length] = pos
+        self._length += 1
+
+    def pop(self):
+        """
+        Remove the last position of the path and return it.
+        :return: tuple (x, y)
+        """
+        if self._length == 0:
+            raise IndexError("pop from empty path")
+
+        self._length -= 1
+        x, y = self._buffer[self._length]
+        return int(x), int(y)
+
+    def index(self, pos):
+        """
+        Returns the index of the first occurrence of pos in the path.
+        :param pos: tuple (x, y)
+        :return: int
+        """
+        path = self._buffer[:self._length]
+        matches = np.flatnonzero((path[:, 0] == pos[0]) & (path[:, 1] == pos[1]))
+        if len(matches) == 0:
+            raise ValueError("{} is not in the path".format(pos))
+
+        return int(matches[0])
+
+    def truncate(self, length):
+        """
+        Cut off the path after the first length positions.
+        :param length: int
+        """
+        self._length = min(length, self._length)
+
+    def toarray(self):
+        """
+        Returns a copy of the path as an array of shape (length, 2).
+        """
+        return self._buffer[:self._length].copy()
+
+    def load(self, path):
+        """
+        Replace the path by an array of positions of shape (length, 2), the inverse of toarray.
+        :param path: integer array of shape (length, 2)
+        """
+        if len(path) > len(self._buffer):
+            self._buffer = np.empty((len(path), 2), dtype=self._buffer.dtype)
+
+        self._buffer[:len(path)] = path
+        self._length = len(path)
+
+    def tolist(self):
+        """
+        Returns the path as a list of tuples.
+        :return: [(x, y), (x, y), ...]
+        """
+        return [(int(x), int(y)) for x, y in self._buffer[:self._length]]
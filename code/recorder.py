@@ -0,0 +1,188 @@
+import json
+import os
+import numpy as np
+
+
+QUANTIZATIONS = {None: np.float64, "float32": np.float32, "float16": np.float16, "uint16": np.uint16,
+                 "uint8": np.uint8}
+
+
+class FieldRecorder:
+    """
+    Opt-in recorder that appends snapshots of the pheromone (and optionally food) field every k time-steps to disk.
+    Snapshots are grouped into chunks of a number of snapshots, one file per chunk, so a run never has to fit in RAM.
+    Uncompressed chunks are .npy files that FieldReader memory-maps, compressed chunks are .npz files that are only
+    decompressed when a slice touches them. Integer quantizations store each snapshot relative to its own maximum.
+    """
+    def __init__(self, path, every=1, fields=("pheromones",), quantize="float32", chunk=64, compress=False):
+        """
+        :param path: str, directory of the recording, created when it does not exist
+        :param every: int, number of time-steps between snapshots
+        :param fields: tuple of fields to record, "pheromones" and/or "food"
+        :param quantize: str, storage type, one of None (float64), "float32", "float16", "uint16" or "uint8"
+        :param chunk: int, number of snapshots per file
+        :param compress: boolean, True to store the chunks zlib compressed
+        """
+        assert quantize in QUANTIZATIONS, "unknown quantization {}".format(quantize)
+
+        self.path = path
+        self.every = every
+        self.fields = fields
+        self.quantize = quantize
+        self.dtype = np.dtype(QUANTIZATIONS[quantize])
+        self.chunk = chunk
+        self.compress = compress
+
+        self.steps = []
+        self.scales = {field: [] for field in fields}
+        self._buffers = {field: [] for field in fields}
+        self._shape = None
+        self._chunks = 0
+
+        os.makedirs(path, exist_ok=True)
+
+    def record(self, environment):
+        """
+        Store a snapshot of the environment if the current time-step is one of the recorded steps. Called by
+        Environment.step after the pheromones are updated.
+        :param environment: class Environment
+        """
+        step = environment.schedule.steps
+        if step % self.every:
+            return
+
+        self._shape = (environment.width, environment.height)
+        self.steps.append(step)
+
+        for field in self.fields:
+            values = environment.pheromones if field == "pheromones" else environment.food.grid
+            stored, scale = self.encode(values)
+            self._buffers[field].append(stored)
+            self.scales[field].append(scale)
+
+        if len(self._buffers[self.fields[0]]) == self.chunk:
+            self._flush()
+
+    def encode(self, values):
+        """
+        Quantize a field to the storage type.
+        :return: (stored array, scale to multiply the stored values with)
+        """
+        if self.dtype.kind != "u":
+            return values.astype(self.dtype), 1.0
+
+        scale = float(values.max()) / np.iinfo(self.dtype).max
+        if scale <= 0:
+            return np.zeros(values.shape, dtype=self.dtype), 0.0
+
+        return np.rint(np.clip(values, 0, None) / scale).astype(self.dtype), scale
+
+    def _flush(self):
+        """
+        Write the snapshots in memory to the next chunk file. Only the last chunk may be partial, FieldReader finds a
+        snapshot in chunk snapshot // chunk.
+        """
+        if not self._buffers[self.fields[0]]:
+            return
+
+        for field in self.fields:
+            data = np.stack(self._buffers[field])
+            name = os.path.join(self.path, "{}_{:06d}".format(field, self._chunks))
+            if self.compress:
+                np.savez_compressed(name + ".npz", data=data)
+            else:
+                np.save(name + ".npy", data)
+            self._buffers[field] = []
+
+        self._chunks += 1
+
+    def close(self):
+        """
+        Write the last, possibly partial, chunk and the metadata. Call this at the end of a run, a recording can only be
+        read after it is closed.
+        """
+        self._flush()
+
+        meta = {"every": self.every, "fields": list(self.fields), "quantize": self.quantize, "chunk": self.chunk,
+                "compress": self.compress, "shape": self._shape, "steps": self.steps, "scales": self.scales}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+
+class FieldReader:
+    """
+    Reads a recording of FieldRecorder. Indexing a field with [time, x, y] only reads the chunks the time slice
+    touches, and from memory-mapped chunks only the requested region. Time indices are snapshot numbers, see steps.
+
+        reader = FieldReader("data/run")
+        trail = reader["pheromones"][-10:, 5:20, 5:20]
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.every = meta["every"]
+        self.fields = meta["fields"]
+        self.quantize = meta["quantize"]
+        self.chunk = meta["chunk"]
+        self.compress = meta["compress"]
+        self.shape = tuple(meta["shape"])
+        self.steps = np.array(meta["steps"])
+        self.scales = {field: np.array(scales) for field, scales in meta["scales"].items()}
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, field):
+        assert field in self.fields, "{} was not recorded".format(field)
+        return FieldView(self, field)
+
+    def load_chunk(self, field, index):
+        """
+        Returns the stored array of a chunk, memory-mapped if it is not compressed.
+        """
+        name = os.path.join(self.path, "{}_{:06d}".format(field, index))
+        if self.compress:
+            with np.load(name + ".npz") as chunk:
+                return chunk["data"]
+
+        return np.load(name + ".npy", mmap_mode="r")
+
+
+class FieldView:
+    """ A lazily loaded field of a recording, indexed as [time, x, y]. """
+    def __init__(self, reader, field):
+        self.reader = reader
+        self.field = field
+        self.shape = (len(reader),) + reader.shape
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        time, region = key[0], key[1:]
+
+        snapshots = np.arange(len(self.reader))[time]
+        single = np.ndim(snapshots) == 0
+        snapshots = np.atleast_1d(snapshots)
+
+        # read every chunk once, and put the snapshots back in the requested order afterwards
+        chunks = snapshots // self.reader.chunk
+        order = np.argsort(chunks, kind="stable")
+
+        frames = []
+        for index in np.unique(chunks):
+            data = self.reader.load_chunk(self.field, index)
+            selected = snapshots[chunks == index] - index * self.reader.chunk
+            frames.append(np.asarray(data[(selected,) + region], dtype=np.float64))
+
+        if not frames:
+            return np.empty((0,) + self.reader.shape)[(slice(None),) + region]
+
+        values = np.empty_like(np.concatenate(frames))
+        values[order] = np.concatenate(frames)
+
+        scales = self.reader.scales[self.field][snapshots]
+        values *= scales.reshape((-1,) + (1,) * (values.ndim - 1))
+
+        return values[0] if single else values
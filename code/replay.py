@@ -0,0 +1,262 @@
+import json
+import os
+import numpy as np
+from recorder import FieldReader, FieldRecorder
+
+# Bits of the per-ant flags
+CARRY_FOOD = 1
+ALIVE = 2
+
+
+def layout(environment):
+    """
+    Returns the static part of an environment: its size, colonies (x, y, radius) and obstacles.
+    :param environment: class Environment
+    :return: dict
+    """
+    return {"width": environment.width, "height": environment.height,
+            "colonies": [[int(c) for c in colony.pos] + [colony.radius] for colony in environment.colonies],
+            "obstacles": [[int(c) for c in obstacle.pos] for obstacle in environment.obstacles]}
+
+
+def ant_state(environment):
+    """
+    Returns the positions, ids and flags of all ants of an environment as packed arrays.
+    :param environment: class Environment
+    :return: (int16 positions of shape (n, 2), int32 ids, uint8 flags)
+    """
+    ants = environment.schedule.agents
+    positions = np.array([ant.pos for ant in ants], dtype=np.int16).reshape(-1, 2)
+    ids = np.array([ant.unique_id for ant in ants], dtype=np.int32)
+    flags = np.array([(CARRY_FOOD if ant.carry_food else 0) | (ALIVE if ant.alive else 0) for ant in ants],
+                     dtype=np.uint8)
+
+    return positions, ids, flags
+
+
+class AntLog:
+    """
+    Records a run once so it can be replayed many times without an Environment. After every time-step the positions of
+    all ants are appended as packed int16 pairs, together with their ids and a byte of flags (carrying food, alive).
+    Pheromone and food keyframes are stored every keyframe_every steps with a FieldRecorder. Pass it to Environment as
+    recorder, and close it at the end of the run.
+    """
+    def __init__(self, path, keyframe_every=10, quantize="float16"):
+        """
+        :param path: str, directory of the log, created when it does not exist
+        :param keyframe_every: int, number of time-steps between pheromone and food keyframes
+        :param quantize: str, storage type of the keyframes, see FieldRecorder
+        """
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.keyframes = FieldRecorder(os.path.join(path, "keyframes"), every=keyframe_every,
+                                       fields=("pheromones", "food"), quantize=quantize)
+        self.offsets = [0]
+        self.steps = []
+        self.layout = None
+
+        self._positions = open(os.path.join(path, "positions.int16"), "wb")
+        self._ids = open(os.path.join(path, "ids.int32"), "wb")
+        self._flags = open(os.path.join(path, "flags.uint8"), "wb")
+
+    def record(self, environment):
+        """
+        Append the state of the ants after a time-step, called by Environment.step.
+        :param environment: class Environment
+        """
+        if self.layout is None:
+            self.layout = layout(environment)
+
+        positions, ids, flags = ant_state(environment)
+        self._positions.write(positions.tobytes())
+        self._ids.write(ids.tobytes())
+        self._flags.write(flags.tobytes())
+
+        self.offsets.append(self.offsets[-1] + len(ids))
+        self.steps.append(environment.schedule.steps)
+        self.keyframes.record(environment)
+
+    def close(self):
+        """
+        Write the remaining data and the index of the log.
+        """
+        for f in (self._positions, self._ids, self._flags):
+            f.close()
+        self.keyframes.close()
+
+        with open(os.path.join(self.path, "log.json"), "w") as f:
+            json.dump(dict(self.layout or {}, steps=self.steps, offsets=self.offsets), f)
+
+
+class Layout:
+    """ The static part of a run that a ReplayPlayer draws once, see layout. """
+    def __init__(self, width, height, colonies, obstacles, **_):
+        self.width = width
+        self.height = height
+        self.colonies = colonies
+        self.obstacles = np.array(obstacles, dtype=int).reshape(-1, 2)
+
+
+class Replay(Layout):
+    """ Reads an AntLog. The ant data is memory-mapped, so logs larger than the memory can be replayed. """
+    def __init__(self, path):
+        with open(os.path.join(path, "log.json")) as f:
+            log = json.load(f)
+
+        super().__init__(**log)
+        self.steps = np.array(log["steps"])
+        self.offsets = np.array(log["offsets"])
+
+        total = self.offsets[-1]
+        self.positions = np.memmap(os.path.join(path, "positions.int16"), dtype=np.int16, mode="r", shape=(total, 2)) \
+            if total else np.empty((0, 2), dtype=np.int16)
+        self.ids = np.memmap(os.path.join(path, "ids.int32"), dtype=np.int32, mode="r", shape=(total,)) \
+            if total else np.empty(0, dtype=np.int32)
+        self.flags = np.memmap(os.path.join(path, "flags.uint8"), dtype=np.uint8, mode="r", shape=(total,)) \
+            if total else np.empty(0, dtype=np.uint8)
+
+        self.keyframes = FieldReader(os.path.join(path, "keyframes"))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def ants(self, frame):
+        """
+        Returns the ants of a frame.
+        :param frame: int, index of the frame
+        :return: (positions, ids, flags)
+        """
+        start, stop = self.offsets[frame], self.offsets[frame + 1]
+        return self.positions[start:stop], self.ids[start:stop], self.flags[start:stop]
+
+    def keyframe(self, frame):
+        """
+        Returns the pheromones and food of the last keyframe at or before a frame, or None before the first keyframe.
+        :param frame: int, index of the frame
+        :return: (pheromones, food) or (None, None)
+        """
+        index = np.searchsorted(self.keyframes.steps, self.steps[frame], side="right") - 1
+        if index < 0:
+            return None, None
+
+        return self.keyframes["pheromones"][index], self.keyframes["food"][index]
+
+
+class ReplayPlayer:
+    """
+    Renders a Replay with matplotlib. All ants of a frame are drawn as one scatter plot, which keeps rendering cheap for
+    many ants. Use play to watch it at any speed, scrub for a slider, or export to write a video. A player of a Layout
+    can draw states that don't come from a log with draw_state.
+    """
+    def __init__(self, replay, ax=None):
+        import matplotlib.pyplot as plt
+
+        self.replay = replay
+        if ax is None:
+            ax = plt.figure().add_subplot(111)
+        self.ax = ax
+
+        height = replay.height
+        self.pheromone_im = ax.imshow(np.zeros((height, replay.width)), vmin=0, vmax=5, interpolation="None",
+                                      cmap="Greens")
+        for x, y, radius in replay.colonies:
+            ax.add_patch(plt.Circle((x, height - 1 - y), radius + 0.5, color="r", zorder=1))
+        ax.scatter(replay.obstacles[:, 0], height - 1 - replay.obstacles[:, 1], c="y", s=30, zorder=1)
+
+        self.food = ax.scatter([], [], c="g", marker="s", s=40, zorder=1)
+        self.ants = ax.scatter([], [], c="w", edgecolors="k", marker="s", s=12, zorder=2)
+
+    def draw(self, frame):
+        """
+        Update the artists to a frame.
+        :param frame: int, index of the frame
+        :return: list of the updated artists
+        """
+        positions, _, flags = self.replay.ants(frame)
+        pheromones, food = self.replay.keyframe(frame)
+
+        return self.draw_state(self.replay.steps[frame], positions, flags, pheromones, food)
+
+    def draw_state(self, step, positions, flags, pheromones=None, food=None):
+        """
+        Update the artists to a state.
+        :param step: int, the iteration shown in the title
+        :param positions: int array of shape (n, 2), positions of the ants
+        :param flags: uint8 array, flags of the ants
+        :param pheromones: float array of shape (width, height), or None to keep the previous pheromones and food
+        :param food: float array of shape (width, height)
+        :return: list of the updated artists
+        """
+        height = self.replay.height
+
+        colors = np.full(len(flags), "w", dtype=object)
+        colors[flags & CARRY_FOOD > 0] = "g"
+        colors[flags & ALIVE == 0] = "k"
+        self.ants.set_offsets(np.column_stack((positions[:, 0], height - 1 - positions[:, 1])))
+        self.ants.set_facecolors(list(colors))
+
+        if pheromones is not None:
+            self.pheromone_im.set_array(np.rot90(pheromones))
+            x, y = np.nonzero(food > 0)
+            self.food.set_offsets(np.column_stack((x, height - 1 - y)))
+
+        self.ax.set_title("iteration: " + str(step))
+        return [self.ants, self.food, self.pheromone_im]
+
+    def play(self, speed=1, start=0, stop=None, interval=0.001):
+        """
+        Show the replay, speed is the number of frames that is advanced per drawn frame.
+        """
+        import matplotlib.pyplot as plt
+
+        for frame in range(start, stop or len(self.replay), speed):
+            if not plt.fignum_exists(self.ax.figure.number):
+                return False
+            self.draw(frame)
+            plt.pause(interval)
+
+        return True
+
+    def scrub(self):
+        """
+        Show the replay with a slider to move through the frames.
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import Slider
+
+        self.ax.figure.subplots_adjust(bottom=0.15)
+        slider = Slider(self.ax.figure.add_axes([0.15, 0.03, 0.7, 0.03]), "frame", 0, len(self.replay) - 1,
+                        valinit=0, valstep=1)
+        slider.on_changed(lambda value: (self.draw(int(value)), self.ax.figure.canvas.draw_idle()))
+        self.draw(0)
+        plt.show()
+
+        return slider
+
+    def export(self, filename, fps=30, speed=1):
+        """
+        Write the replay to a video (e.g. .mp4 with ffmpeg) or .gif file.
+        """
+        from matplotlib.animation import FuncAnimation
+
+        animation = FuncAnimation(self.ax.figure, self.draw, frames=range(0, len(self.replay), speed), blit=False)
+        animation.save(filename, fps=fps)
+
+
+if __name__ == '__main__':
+    import argparse
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser("replay")
+    parser.add_argument("path", help="directory of an AntLog")
+    parser.add_argument("-speed", "--speed", help="int, frames per drawn frame", type=int, default=1)
+    parser.add_argument("-export", "--export", help="str, write the replay to this video file", required=False)
+    args = parser.parse_args()
+
+    player = ReplayPlayer(Replay(args.path))
+    if args.export:
+        player.export(args.export, speed=args.speed)
+    else:
+        player.play(args.speed)
+        plt.show()
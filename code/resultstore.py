@@ -0,0 +1,101 @@
+import hashlib
+import json
+import sqlite3
+import time
+import numpy as np
+
+
+class ResultStore:
+    """
+    Local SQLite store of finished simulations. Every result is keyed by a hash of the full parameter set, the seed and
+    the model version, so a sweep only has to compute the points that are not in the store yet.
+    """
+    def __init__(self, path="data/results.sqlite", version=None):
+        """
+        :param path: str, location of the SQLite database, created when it does not exist
+        :param version: the model version the results belong to, defaults to model.MODEL_VERSION
+        """
+        if version is None:
+            from model import MODEL_VERSION
+            version = MODEL_VERSION
+
+        self.path = path
+        self.version = version
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                                 "key TEXT PRIMARY KEY, params TEXT, seed INTEGER, version TEXT, "
+                                 "iteration INTEGER, created REAL)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS metrics ("
+                                 "key TEXT, name TEXT, value REAL, PRIMARY KEY (key, name))")
+        self._connection.commit()
+
+    @staticmethod
+    def canonical(params):
+        """
+        Returns the parameters as plain Python values, numpy scalars (e.g. from np.linspace) are converted and the dtype
+        becomes its name, so np.float32 and "float32" are the same point.
+        :param params: dict of Environment keyword arguments and the number of steps
+        :return: dict
+        """
+        def plain(name, value):
+            if name == "dtype":
+                return np.dtype(value).name
+
+            return value.item() if hasattr(value, "item") else value
+
+        return {name: plain(name, value) for name, value in params.items()}
+
+    def key(self, params, seed):
+        """
+        Returns the content hash of a parameter point.
+        :param params: dict of Environment keyword arguments and the number of steps
+        :param seed: int, the random seed of the run
+        :return: str, hex digest
+        """
+        content = json.dumps({"params": self.canonical(params), "seed": seed, "version": str(self.version)},
+                             sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, params, seed):
+        """
+        Returns the stored iteration count of a parameter point, or None if it was not computed yet.
+        """
+        row = self._connection.execute("SELECT iteration FROM results WHERE key = ?",
+                                       (self.key(params, seed),)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, params, seed, iteration):
+        """
+        Store the iteration count of a finished parameter point.
+        """
+        self._connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                 (self.key(params, seed), json.dumps(self.canonical(params), sort_keys=True), seed,
+                                  str(self.version), int(iteration), time.time()))
+        self._connection.commit()
+
+    def get_metrics(self, params, seed):
+        """
+        Returns the stored metrics of a parameter point, an empty dict if there are none. Missing values are NaN.
+        """
+        rows = self._connection.execute("SELECT name, value FROM metrics WHERE key = ?",
+                                        (self.key(params, seed),)).fetchall()
+        return {name: float("nan") if value is None else value for name, value in rows}
+
+    def put_metrics(self, params, seed, metrics):
+        """
+        Store the metrics (a dict of name: float) of a finished parameter point.
+        """
+        key = self.key(params, seed)
+        self._connection.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?)",
+                                     [(key, name, float(value)) for name, value in metrics.items()])
+        self._connection.commit()
+
+    def __contains__(self, item):
+        params, seed = item
+        return self.get(params, seed) is not None
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
@@ -2,6 +2,8 @@ from model import Environment
 import matplotlib.pyplot as plt
 import numpy as np
 import argparse
+import queue
+import threading
 
 WIDTH = 26
 HEIGHT = 26
@@ -49,6 +51,90 @@ def plot_continuous(env, steps=1000):
     return True
 
 
+def snapshot(env, iteration):
+    """
+    Returns an immutable frame of the current state of the environment, which can be drawn by another thread.
+    :return: tuple (iteration, ant positions, ant flags, pheromones, food)
+    """
+    from replay import ant_state
+
+    positions, _, flags = ant_state(env)
+    frame = (iteration, positions, flags, env.pheromones.copy(), env.food.grid.copy())
+    for array in frame[1:]:
+        array.setflags(write=False)
+
+    return frame
+
+
+def publish(frames, frame):
+    """
+    Put a frame in the bounded queue, dropping the oldest frame when the display is lagging behind.
+    """
+    while True:
+        try:
+            frames.put_nowait(frame)
+            return
+        except queue.Full:
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def simulate(env, steps, frames, stop):
+    """
+    Step the environment in a background thread, and publish a frame after every step. None marks the end.
+    """
+    for i in range(steps):
+        if stop.is_set():
+            break
+
+        env.step()
+        publish(frames, snapshot(env, i + 1))
+
+    publish(frames, None)
+
+
+def plot_threaded(env, steps=1000, queue_size=2):
+    """
+    Interactive mode in which the simulation runs in a background thread at compute speed. The display only draws the
+    latest frame, stale frames are dropped, so the simulation never waits on matplotlib.
+    :param queue_size: int, number of frames that may wait for the display
+    """
+    from replay import Layout, ReplayPlayer, layout
+
+    fig = plt.figure()
+    player = ReplayPlayer(Layout(**layout(env)), fig.add_subplot(111))
+    player.draw_state(*snapshot(env, 0))
+
+    frames = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    worker = threading.Thread(target=simulate, args=(env, steps, frames, stop), daemon=True)
+    worker.start()
+
+    frame = ()
+    while frame is not None:
+        if not plt.fignum_exists(fig.number):
+            stop.set()
+            return False
+
+        # skip to the newest frame
+        try:
+            frame = frames.get(timeout=0.1)
+            while not frames.empty() and frame is not None:
+                frame = frames.get_nowait()
+        except queue.Empty:
+            plt.pause(0.001)
+            continue
+
+        if frame is not None:
+            player.draw_state(*frame)
+        plt.pause(0.001)
+
+    print("Ended simulation.")
+    return True
+
+
 def parser():
     parser = argparse.ArgumentParser("run_simulation")
     parser.add_argument("-decay",
@@ -66,8 +152,12 @@ def parser():
                         help="float, strength of pheromones (default = 4.5)",
                         type=float,
                         required=False)
+    parser.add_argument("-threaded",
+                        "--threaded",
+                        help="run the simulation in a background thread, the display shows the latest step",
+                        action="store_true")
     args = parser.parse_args()
-    return args.decay or DECAY, args.sigma or SIGMA, args.strength or STRENGTH
+    return args.decay or DECAY, args.sigma or SIGMA, args.strength or STRENGTH, args.threaded
 
 
 def compute_no_plot(env, steps):
@@ -96,9 +186,12 @@ def animate_distribution(path_lengths, steps):
 
 if __name__ == '__main__':
 
-    decay, sigma, strength = parser()
+    decay, sigma, strength, threaded = parser()
 
     env = Environment(width=WIDTH, height=HEIGHT, n_colonies=1, n_ants=40,
                       n_obstacles=30, decay=decay, sigma=sigma,
                       moore=False, pheromone_strength=strength)
-    plot_continuous(env, STEPS)
+    if threaded:
+        plot_threaded(env, STEPS)
+    else:
+        plot_continuous(env, STEPS)
@@ -0,0 +1,134 @@
+from mesa.time import RandomActivation
+import random
+
+
+class EventActivation(RandomActivation):
+    """
+    A RandomActivation scheduler that only activates ants which will actually act this time-step. Ants that are
+    stalled on an obstacle are parked in a timing wheel until the step in which they wake up, and dead ants are dropped
+    from the active set. self.agents still holds every agent, so metrics and animation are unaffected.
+    """
+    def __init__(self, model, slots=64):
+        """
+        :param model: class Environment
+        :param slots: int, number of buckets in the timing wheel
+        """
+        super().__init__(model)
+
+        self._active = []
+        self._wheel = [[] for _ in range(slots)]
+        self.parked = 0
+        self.woken = 0
+
+    def add(self, agent):
+        """
+        Add an agent to the schedule, it is activated from the next time-step onwards.
+        :param agent: class Ant
+        """
+        super().add(agent)
+
+        if getattr(agent, "alive", True):
+            self._active.append(agent)
+
+    def remove(self, agent):
+        """
+        Remove an agent from the schedule, the active set and the timing wheel.
+        :param agent: class Ant
+        """
+        super().remove(agent)
+
+        if agent in self._active:
+            self._active.remove(agent)
+
+        for bucket in self._wheel:
+            bucket[:] = [entry for entry in bucket if entry[1] is not agent]
+
+    def park(self, agent, wake_step):
+        """
+        Park an agent in the timing wheel until wake_step.
+        :param agent: class Ant
+        :param wake_step: int, the time-step in which the agent acts again
+        """
+        self._wheel[wake_step % len(self._wheel)].append((wake_step, agent))
+        self.parked += 1
+
+    def wake(self):
+        """
+        Move all agents that wake up this time-step from the timing wheel back to the active set. Wheel entries that
+        belong to a later revolution stay in their bucket.
+        """
+        bucket = self._wheel[self.steps % len(self._wheel)]
+        if not bucket:
+            return
+
+        waiting = []
+        for wake_step, agent in bucket:
+            if wake_step > self.steps:
+                waiting.append((wake_step, agent))
+                continue
+
+            agent.skip(agent.slowScore)
+            self.woken += 1
+            if agent.alive:
+                self._active.append(agent)
+
+        bucket[:] = waiting
+
+    def step(self):
+        """
+        Executes the step of all active agents, one at a time, in random order. Afterwards dead agents are dropped and
+        stalled agents are parked until they can move again.
+        """
+        self.wake()
+
+        random.shuffle(self._active)
+        active = []
+        for agent in self._active[:]:
+            agent.step()
+
+            if not agent.alive:
+                continue
+
+            if agent.slowScore > 0:
+                # the ant idles for slowScore steps, and moves in the step after
+                self.park(agent, self.steps + agent.slowScore + 1)
+            else:
+                active.append(agent)
+
+        self._active = active
+        self.steps += 1
+        self.time += 1
+
+    def get_active_count(self):
+        """ Returns the number of agents that act in the next time-step. """
+        return len(self._active)
+
+
+def check(steps=60, cost=3, seed=0):
+    """
+    Run an event-driven Environment with a strip of passable terrain across the grid, and check that ants stalled on it
+    are parked and woken, and that every live ant is either active or parked.
+    :return: dict with the number of parked and woken ants
+    """
+    import numpy as np
+    from model import Environment
+
+    terrain = np.zeros((20, 20))
+    terrain[:, 13] = cost
+    env = Environment(20, 20, 1, 20, 0, collect=False, terrain=terrain, event_driven=True,
+                      seed=seed)
+    for _ in range(steps):
+        env.step()
+
+    schedule = env.schedule
+    parked = [agent for bucket in schedule._wheel for _, agent in bucket]
+    alive = [agent for agent in schedule.agents if agent.alive]
+    assert schedule.parked > 0 and schedule.woken > 0, "no ant was parked and woken"
+    assert sorted(map(id, schedule._active + parked)) == sorted(map(id, alive)), \
+        "the active set and the timing wheel don't hold exactly the live ants"
+
+    return {"parked": schedule.parked, "woken": schedule.woken}
+
+
+if __name__ == '__main__':
+    print(check())
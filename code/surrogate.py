@@ -0,0 +1,207 @@
+import numpy as np
+from diffusion import gaussian_kernel
+
+# Default margin of MeanField.screen, just below the lowest peak level of a converged run in data/sweeps (26x26, 30
+# ants), so screen rules out none of them. Run surrogate.py to recalibrate it
+MARGIN = 1.5
+
+
+def trail_gain(sigma, decay, offset=0, size=512):
+    """
+    Returns the steady-state pheromone level on (or next to) a straight trail that receives one unit of pheromone per
+    cell per time-step, under the update P <- decay * G(P + deposits) of Environment.update_pheromones. Along a uniform
+    trail only the spread across it matters, which is the geometric series sum_m decay^m K^m[offset] of the 1-D kernel
+    K. It is summed in closed form in the frequency domain.
+    :param sigma: float, sigma of the Gaussian convolution
+    :param decay: float, decay of the pheromones
+    :param offset: int, distance across the trail in cells, 0 is on the trail
+    :param size: int, number of cells across the trail used for the transform
+    :return: float, infinite for decay >= 1, when the pheromones never decay
+    """
+    if decay >= 1:
+        return np.inf
+
+    kernel = gaussian_kernel(sigma)
+    padded = np.zeros(size)
+    padded[:len(kernel)] = kernel
+    padded = np.roll(padded, -(len(kernel) // 2))
+
+    spectrum = np.real(np.fft.fft(padded))
+    return float(np.real(np.fft.ifft(decay * spectrum / (1 - decay * spectrum)))[offset])
+
+
+class MeanField:
+    """
+    Mean-field surrogate of the Environment, vectorized over many (decay, sigma, strength) points. Instead of ants it
+    tracks the expected number of ants on the trail between the colony and the food, the pheromone level on that trail,
+    and the food left:
+
+    - searching ants discover the food by a random walk, and are recruited when they stay on the trail all the way. Like
+      the pheromone bias of Ant.move a single step does so with probability (P + 0.1) / (P + P_side + 0.2), where P_side
+      is the pheromone that diffused to the cells next to the trail. A wide spread and slow decay saturate the
+      neighbourhood of the trail, so it guides the ants less;
+    - returning ants deposit pheromones, which follow the reaction-diffusion update of the Environment reduced to the
+      trail (see trail_gain);
+    - ants on the trail carry food back every round trip.
+
+    Like Environment.check_exit a run ends when the food is gone while the trail holds more than 1 pheromone. It is
+    meant to rank and screen parameter points, not to replace the agent-based model.
+    """
+    def __init__(self, width, height, n_ants, food=10000, carry_capacity=10):
+        """
+        :param width: int, width of the system
+        :param height: int, height of the system
+        :param n_ants: int, number of ants
+        :param food: float, amount of food of a food source
+        :param carry_capacity: float, mean amount of food an ant carries
+        """
+        self.n_ants = n_ants
+        self.food = food
+        self.carry_capacity = carry_capacity
+
+        # mean distance between the colony in the centre and a random food source, and the round trip time
+        self.length = max((width + height) / 4, 1)
+        self.trip = 2 * self.length
+
+        # rate at which a searching ant finds the food by an unbiased random walk
+        area = width * height
+        self.discovery = np.pi / (area * np.log(area))
+
+    def peak(self, decays, sigmas, strengths):
+        """
+        Returns the steady-state pheromone level on the trail when all ants are on it.
+        """
+        gains = np.vectorize(trail_gain)(sigmas, decays)
+        return gains * strengths * self.n_ants / self.trip
+
+    def predict(self, decays, sigmas, strengths, steps):
+        """
+        Integrate the mean-field model for all points at once.
+        :param decays: array of decays
+        :param sigmas: array of sigmas
+        :param strengths: array of pheromone strengths
+        :param steps: int, maximum number of time-steps, as in the sweeps
+        :return: (iterations, converged), the predicted iteration in which the run ends (steps - 1 if it doesn't) and
+                 whether it ended
+        """
+        decays, sigmas, strengths = np.broadcast_arrays(np.asarray(decays, dtype=float),
+                                                        np.asarray(sigmas, dtype=float),
+                                                        np.asarray(strengths, dtype=float))
+
+        # one-pole filter with the exact steady-state gain of the trail and the exact first step
+        gains = np.vectorize(trail_gain)(sigmas, decays)
+        centre = np.vectorize(lambda sigma: np.max(gaussian_kernel(sigma)))(sigmas)
+        inflow = decays * centre
+        retention = 1 - inflow / gains
+        # without decay the pheromones saturate the neighbourhood of the trail as much as the trail itself
+        with np.errstate(invalid="ignore"):
+            side = np.where(np.isfinite(gains), np.vectorize(trail_gain)(sigmas, decays, 1) / gains, 1.0)
+
+        on_trail = np.zeros(decays.shape)
+        pheromone = np.zeros(decays.shape)
+        food = np.full(decays.shape, float(self.food))
+        iterations = np.full(decays.shape, steps - 1)
+        running = np.ones(decays.shape, dtype=bool)
+
+        for step in range(steps):
+            stay = (pheromone + 0.1) / (pheromone * (1 + side) + 0.2)
+            success = stay ** self.length
+
+            searching = self.n_ants - on_trail
+            recruited = searching * (self.discovery + success / self.length)
+            lost = on_trail * (1 - success) / self.trip
+            on_trail = np.clip(on_trail + recruited - lost, 0, self.n_ants)
+
+            deposits = strengths * on_trail / self.trip
+            pheromone = retention * pheromone + inflow * deposits
+
+            food -= self.carry_capacity * on_trail / self.trip
+            empty = running & (food <= 0)
+
+            ended = empty & (pheromone > 1)
+            iterations[ended] = step
+            running &= ~ended
+
+            # the food is gone before a trail formed, a new food source is added
+            food[empty & ~ended] = self.food
+
+            if not running.any():
+                break
+
+        return iterations, ~running
+
+    def screen(self, decays, sigmas, strengths, margin=MARGIN):
+        """
+        Returns which points clearly never converge: even with all ants on the trail its pheromone level stays below
+        margin, while the runs only end with a level above 1. See calibrate for the default margin.
+        """
+        return self.peak(decays, sigmas, strengths) < margin
+
+
+def simulations(dataset, width=26, height=26, n_ants=30):
+    """
+    Returns the simulated points of a SweepDataset on a grid, with a known outcome. Rows without a width, like the
+    imported pickles, are taken to be of the grid of getdata.py.
+    :return: DataFrame with the columns decay, sigma, strength, steps, iteration and censored
+    """
+    df = dataset.load(columns=["width", "height", "n_ants", "decay", "sigma", "strength", "steps", "iteration",
+                               "censored", "method"])
+    grid = (df["width"].isna() | ((df["width"] == width) & (df["height"] == height) & (df["n_ants"] == n_ants)))
+    df = df[grid & (df["method"] == "simulation") & df["censored"].notna() & df["steps"].notna()]
+
+    return df[["decay", "sigma", "strength", "steps", "iteration", "censored"]].astype({"censored": bool})
+
+
+def validate(dataset, width=26, height=26, n_ants=30, margins=(0.5, 1, 1.5, 2, 3, 5)):
+    """
+    Compare the surrogate with the simulations of a SweepDataset, see simulations.
+    :return: dict with the number of points and of converged points, the fraction of points on which predict agrees
+             with the simulations whether they converge, and per margin the number of points screen rules out and how
+             many of those did converge
+    """
+    df = simulations(dataset, width, height, n_ants)
+    surrogate = MeanField(width, height, n_ants)
+    converged = ~df["censored"].to_numpy()
+
+    agree = []
+    for steps, points in df.groupby("steps"):
+        _, predicted = surrogate.predict(points["decay"], points["sigma"], points["strength"], int(steps))
+        agree.append(predicted == ~points["censored"].to_numpy())
+
+    peaks = surrogate.peak(df["decay"].to_numpy(), df["sigma"].to_numpy(), df["strength"].to_numpy())
+    screens = {margin: (int(np.sum(peaks < margin)), int(np.sum((peaks < margin) & converged))) for margin in margins}
+
+    return {"points": len(df), "converged": int(converged.sum()),
+            "agreement": float(np.mean(np.concatenate(agree))) if agree else np.nan, "screens": screens}
+
+
+def calibrate(dataset, width=26, height=26, n_ants=30, false_rate=0.0):
+    """
+    Returns the largest margin of screen that rules out at most a fraction false_rate of the converged simulations of a
+    SweepDataset, see simulations.
+    """
+    df = simulations(dataset, width, height, n_ants)
+    converged = df[~df["censored"]]
+    peaks = np.sort(MeanField(width, height, n_ants).peak(converged["decay"].to_numpy(), converged["sigma"].to_numpy(),
+                                                          converged["strength"].to_numpy()))
+
+    return float(peaks[int(false_rate * len(peaks))]) if len(peaks) else np.nan
+
+
+def report(path="data/sweeps"):
+    """
+    Print a validation report of the surrogate against the sweeps, see validate and calibrate.
+    """
+    from dataset import SweepDataset
+
+    dataset = SweepDataset(path)
+    result = validate(dataset)
+    print("{points} simulated points, {converged} converged, predict agrees on {agreement:.1%}".format(**result))
+    print("{:>7} {:>9} {:>10}".format("margin", "screened", "converged"))
+    for margin, (screened, converged) in result["screens"].items():
+        print("{:>7} {:>9} {:>10}".format(margin, screened, converged))
+    print("largest margin without screening a converged run: {:.3f}".format(calibrate(dataset)))
+
+
+if __name__ == '__main__':
+    report()
@@ -0,0 +1,151 @@
+from model import Environment
+from resultstore import ResultStore
+import metrics
+import inspect
+
+# Execution options that don't change the outcome of a run (see diffusion.TiledFilter), they are left out of the key of
+# a point in a ResultStore
+INVARIANT = ("threads",)
+
+# The defaults of the keyword arguments of Environment, arguments equal to them are left out of the key too, so a point
+# has the same key whether an option is given explicitly (e.g. by a tuner) or not
+DEFAULTS = ResultStore.canonical({name: parameter.default
+                                  for name, parameter in inspect.signature(Environment).parameters.items()
+                                  if parameter.default is not parameter.empty})
+
+
+def get_iterations(env, steps):
+    """
+    Run the environment until it ends, or for at most steps time-steps.
+    :return: int, the last iteration
+    """
+    for iteration in range(steps):
+
+        # take a step
+        status = env.step()
+
+        if status == "ended":
+            break
+
+    return iteration
+
+
+def screened(params, surrogate):
+    """
+    Returns True if a surrogate screens the point out as clearly never converging. Sweeps may skip the simulation of
+    such points, their rows are marked with the method "surrogate" and they are never added to a ResultStore.
+    :param params: dict, keyword arguments of Environment
+    :param surrogate: MeanField or None
+    """
+    if surrogate is None:
+        return False
+
+    return bool(surrogate.screen(params["decay"], params["sigma"], params["pheromone_strength"]))
+
+
+def tuned(params, tuner):
+    """
+    Returns the parameters with the execution options a tuner picks for them, options in params are kept. Options
+    like event_driven or dtype change the outcome, so the tuned parameters are what a run is stored under.
+    :param params: dict, keyword arguments of Environment
+    :param tuner: AutoTuner or None
+    :return: dict
+    """
+    if tuner is None:
+        return params
+
+    return dict(tuner.choose(params), **params)
+
+
+def store_key(params, steps):
+    """
+    Returns the parameter point of a run in a ResultStore: the parameters and the number of steps, without the options
+    in INVARIANT and the arguments that equal their default.
+    """
+    point = ResultStore.canonical(dict(params, steps=steps))
+    return {name: value for name, value in point.items()
+            if name not in INVARIANT and not (name in DEFAULTS and DEFAULTS[name] == value)}
+
+
+def run_point(params, steps, seed=0, store=None, tuner=None):
+    """
+    Returns the number of iterations of a single simulation. When a store is given, a finished point is read from it
+    instead of simulated, and new results are added to it.
+    :param params: dict, keyword arguments of Environment
+    :param steps: int, maximum number of time-steps
+    :param seed: int, seed of the random generators
+    :param store: ResultStore or None
+    :param tuner: AutoTuner or None, picks the fastest execution options of the Environment
+    :return: int
+    """
+    params = tuned(params, tuner)
+    point = store_key(params, steps)
+    if store is not None:
+        iteration = store.get(point, seed)
+        if iteration is not None:
+            return iteration
+
+    iteration, _ = simulate(params, steps, seed)
+
+    if store is not None:
+        store.put(point, seed, iteration)
+
+    return iteration
+
+
+def run_replica(params, steps, seed=0, store=None, tuner=None):
+    """
+    Like run_point, but also returns the path length metrics at the end of the run.
+    :return: dict with the iteration, "min path length" and "mean min path length"
+    """
+    params = tuned(params, tuner)
+    point = store_key(params, steps)
+    if store is not None:
+        iteration = store.get(point, seed)
+        values = store.get_metrics(point, seed)
+        if iteration is not None and values:
+            return dict(values, iteration=iteration)
+
+    iteration, env = simulate(params, steps, seed)
+    values = {"min path length": float(metrics.min_path_length(env)),
+              "mean min path length": float(metrics.mean_min_path_length(env))}
+
+    if store is not None:
+        store.put(point, seed, iteration)
+        store.put_metrics(point, seed, values)
+
+    return dict(values, iteration=iteration)
+
+
+def simulate(params, steps, seed):
+    """
+    Run a single seeded simulation without data collection.
+    :return: (last iteration, the environment)
+    """
+    env = Environment(collect=False, seed=seed, **params)
+
+    return get_iterations(env, steps), env
+
+
+def check(params=None, steps=150, seed=0):
+    """
+    Run a parameter point twice with the same seed, and check that both runs end in the same state.
+    :param params: dict, keyword arguments of Environment, a small grid with obstacles by default
+    :return: int, the last iteration
+    """
+    if params is None:
+        params = dict(width=20, height=20, n_colonies=1, n_ants=20, n_obstacles=10, decay=0.95, sigma=0.3,
+                      pheromone_strength=2)
+
+    runs = []
+    for _ in range(2):
+        iteration, env = simulate(params, steps, seed)
+        runs.append((iteration, sorted(obstacle.pos for obstacle in env.obstacles), env.food.get_food_pos(),
+                     env.pheromones.tolist()))
+
+    assert runs[0] == runs[1], "two runs with seed {} differ".format(seed)
+    return runs[0][0]
+
+
+if __name__ == '__main__':
+    print(check())
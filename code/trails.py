@@ -0,0 +1,95 @@
+import heapq
+import numpy as np
+import world
+
+
+def widest_paths(field, passable, source, moore=False):
+    """
+    Widest-path (maximin) Dijkstra over the grid. The width of a path is the minimum of the field over the cells it
+    passes, excluding the source itself.
+    :param field: float array of shape (width, height), e.g. the pheromones
+    :param passable: boolean array of shape (width, height), cells that can be part of a path
+    :param source: tuple (x, y), the start of all paths
+    :param moore: boolean, True/False whether Moore/vonNeumann neighborhoods are used
+    :return: (widths, parents) where widths holds the largest bottleneck with which each cell can be reached, and
+             parents the flat index of the previous cell on that path (-1 for the source and unreachable cells)
+    """
+    width, height = field.shape
+    offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if moore:
+        offsets += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    widths = np.full(field.shape, -np.inf)
+    parents = np.full(field.shape, -1, dtype=np.int64)
+    done = np.zeros(field.shape, dtype=bool)
+
+    widths[source] = np.inf
+    heap = [(-np.inf, source)]
+
+    while heap:
+        _, (x, y) = heapq.heappop(heap)
+        if done[x, y]:
+            continue
+        done[x, y] = True
+
+        for dx, dy in offsets:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or done[nx, ny] or not passable[nx, ny]:
+                continue
+
+            bottleneck = min(widths[x, y], field[nx, ny])
+            if bottleneck > widths[nx, ny]:
+                widths[nx, ny] = bottleneck
+                parents[nx, ny] = x * height + y
+                heapq.heappush(heap, (-bottleneck, (nx, ny)))
+
+    return widths, parents
+
+
+def trace(parents, target):
+    """
+    Returns the path from the source of widest_paths to target.
+    :return: [(x, y), (x, y), ...]
+    """
+    height = parents.shape[1]
+    path = [target]
+    while parents[path[-1]] != -1:
+        path.append(divmod(int(parents[path[-1]]), height))
+
+    return path[::-1]
+
+
+def bottleneck_paths(environment, pheromones=None):
+    """
+    Computes for each colony and food source the path that maximises the minimum pheromone level along it. Its
+    bottleneck is the critical threshold: find_path(pheromone_threshold(t)) connects the two for every t up to it. Cells
+    with impassable obstacles are never part of a path, the colony and food cells themselves don't need pheromones.
+    :param environment: class Environment
+    :param pheromones: float array, a snapshot of the pheromones, defaults to the current pheromones of the environment
+    :return: a list per colony of (threshold, path) tuples per food source, the threshold is -inf if the food can't be
+             reached and inf if it is next to the colony
+    """
+    if pheromones is None:
+        pheromones = environment.pheromones
+
+    passable = ~world.obstacle_mask(environment, passable=False)
+    food_sources = environment.food.get_food_pos()
+
+    all_paths = []
+    for colony in environment.colonies:
+        widths, parents = widest_paths(pheromones, passable, colony.pos, environment.moore)
+
+        colony_paths = []
+        for food in food_sources:
+            # the pheromones on the food itself don't count, so the food is reached via its widest neighbor
+            neighbors = [pos for pos in environment.grid.get_neighborhood(food, environment.moore) if passable[pos]]
+            best = max(neighbors, key=lambda pos: widths[pos], default=None)
+
+            if best is None or widths[best] == -np.inf:
+                colony_paths.append((-np.inf, []))
+            else:
+                colony_paths.append((float(widths[best]), trace(parents, best) + [food]))
+
+        all_paths.append(colony_paths)
+
+    return all_paths
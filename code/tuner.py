@@ -0,0 +1,140 @@
+from model import Environment
+import diffusion
+import numpy as np
+import itertools
+import json
+import os
+import random
+import time
+
+# Grids smaller than this many cells are not worth more than one diffusion thread, so they are not calibrated
+MIN_THREADED_CELLS = 256 * 256
+
+
+class AutoTuner:
+    """
+    Picks the fastest execution options of the Environment for a problem. By default only the number of diffusion
+    threads is tuned, which leaves a seeded run unchanged. With reorder=True the event-driven scheduler is tried too
+    (see event_driven), which activates the ants in another random order, and with approximate=True float32 pheromone
+    fields and coarse pheromone updates, which trade accuracy for speed. Every candidate runs a few micro-steps on the actual parameters, and the fastest is cached on
+    disk per shape of the problem (grid size, number of ants, obstacle density and kernel width), so a sweep calibrates
+    once. sweep.run_point stores a result under the options it ran with.
+
+        tuner = AutoTuner()
+        env = tuner.environment(width=26, height=26, n_colonies=1, n_ants=30, n_obstacles=10, decay=0.99)
+    """
+    def __init__(self, path="data/tuning.json", micro_steps=10, warmup=3, reorder=False, approximate=False,
+                 max_threads=None):
+        """
+        :param path: str, json file of the cached decisions
+        :param micro_steps: int, number of timed time-steps per candidate
+        :param warmup: int, number of time-steps before the timing starts, in which the ants leave the colony
+        :param reorder: boolean, True to also try the event-driven scheduler, which changes the outcome of seeded runs
+        :param approximate: boolean, True to also try the options that trade accuracy for speed
+        :param max_threads: int, maximum number of diffusion threads, the number of cores by default
+        """
+        self.path = path
+        self.micro_steps = micro_steps
+        self.warmup = warmup
+        self.reorder = reorder
+        self.approximate = approximate
+        self.max_threads = max_threads or os.cpu_count()
+
+    def shape(self, params):
+        """
+        Returns the key of the cache for the parameters of an Environment. Problems with the same key are expected to
+        prefer the same options: the decay and pheromone strength barely change the cost of a time-step.
+        """
+        cells = params["width"] * params["height"]
+        return "{}x{} ants={} colonies={} obstacles={:.2f} halo={} moore={} reorder={} approximate={}".format(
+            params["width"], params["height"], params["n_ants"], params.get("n_colonies", 1),
+            params.get("n_obstacles", 0) / cells, diffusion.halo_width(params.get("sigma", 0.1)),
+            bool(params.get("moore", False)), self.reorder, self.approximate)
+
+    def candidates(self, params):
+        """
+        Returns the options to calibrate for the parameters of an Environment.
+        :return: list of dicts of keyword arguments
+        """
+        threads = [1]
+        if params["width"] * params["height"] >= MIN_THREADED_CELLS:
+            threads += [2 ** i for i in range(1, int(np.log2(self.max_threads)) + 1)]
+
+        options = {"threads": threads}
+        if self.reorder:
+            options.update(event_driven=[False, True])
+        if self.approximate:
+            options.update(dtype=["float64", "float32"], coarse_steps=[1, 4])
+
+        return [dict(zip(options, values)) for values in itertools.product(*options.values())]
+
+    def time(self, params, options):
+        """
+        Returns the median duration of a time-step of an Environment with the options, in seconds.
+        """
+        params = {name: value for name, value in params.items() if name != "recorder"}
+        env = Environment(**dict(params, collect=False, **options))
+        for _ in range(self.warmup):
+            env.step()
+
+        durations = []
+        for _ in range(self.micro_steps):
+            start = time.perf_counter()
+            env.step()
+            durations.append(time.perf_counter() - start)
+
+        return float(np.median(durations))
+
+    def calibrate(self, params):
+        """
+        Time all candidates. The random state is restored afterwards, so a seeded run is not affected by calibrating.
+        :return: dict with the fastest options and the timings of all candidates
+        """
+        state, python_state = np.random.get_state(), random.getstate()
+        try:
+            timings = [(self.time(params, options), options) for options in self.candidates(params)]
+        finally:
+            np.random.set_state(state)
+            random.setstate(python_state)
+
+        best = min(timings, key=lambda timing: timing[0])[1]
+        return {"options": best, "timings": [dict(options, seconds=seconds) for seconds, options in timings]}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path) as f:
+            return json.load(f)
+
+    def choose(self, params):
+        """
+        Returns the fastest options for the parameters of an Environment, from the cache or by calibrating.
+        :return: dict of keyword arguments of Environment
+        """
+        key = self.shape(params)
+        cache = self.load()
+        if key not in cache:
+            decision = self.calibrate(params)
+            cache = self.load()
+            cache[key] = decision
+
+            # other sweep workers may write the cache at the same time, the file is replaced in one go
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(temporary, "w") as f:
+                json.dump(cache, f, indent=1)
+            os.replace(temporary, self.path)
+
+        return dict(cache[key]["options"])
+
+    def environment(self, **params):
+        """
+        Returns an Environment with the parameters and the fastest options. Options in params are kept as they are.
+        """
+        options = self.choose(params)
+        options.update(params)
+
+        return Environment(**options)
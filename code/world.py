@@ -0,0 +1,137 @@
+import numpy as np
+
+
+def colony_mask(environment):
+    """
+    Returns a boolean array of the cells that are covered by a colony.
+    :param environment: class Environment
+    :return: boolean array of shape (width, height)
+    """
+    x, y = np.indices((environment.width, environment.height))
+    mask = np.zeros((environment.width, environment.height), dtype=bool)
+    for colony in environment.colonies:
+        mask |= (x - colony.pos[0]) ** 2 + (y - colony.pos[1]) ** 2 <= colony.radius ** 2
+
+    return mask
+
+
+def obstacle_mask(environment, passable=True):
+    """
+    Returns a boolean array of the cells that hold an obstacle.
+    :param environment: class Environment
+    :param passable: boolean, False to leave out the obstacles that ants can cross (cost >= 0)
+    :return: boolean array of shape (width, height)
+    """
+    mask = np.zeros((environment.width, environment.height), dtype=bool)
+    obstacles = [obstacle for obstacle in environment.obstacles if passable or not obstacle.passable]
+    if obstacles:
+        mask[tuple(np.array([obstacle.pos for obstacle in obstacles]).T)] = True
+
+    return mask
+
+
+def free_mask(environment):
+    """
+    Returns a boolean array of the cells without a colony, food or obstacle.
+    :param environment: class Environment
+    :return: boolean array of shape (width, height)
+    """
+    return ~colony_mask(environment) & ~obstacle_mask(environment) & (environment.food.grid <= 0)
+
+
+def sample_cells(mask, n):
+    """
+    Draws n different cells from the cells that are True in mask, in a single pass.
+    :param mask: boolean array of shape (width, height)
+    :param n: int, number of cells
+    :return: [(x, y), (x, y), ...]
+    """
+    cells = np.flatnonzero(mask)
+    assert n <= len(cells), "can't place {} objects on {} free cells".format(n, len(cells))
+
+    x, y = np.unravel_index(np.random.choice(cells, n, replace=False), mask.shape)
+    return list(zip(x.tolist(), y.tolist()))
+
+
+def load_terrain(path, width=None, height=None):
+    """
+    Load a cost map of obstacles. Arrays (.npy, or the first array of a .npz) are indexed as [x, y] like the pheromones
+    of the Environment, a cell with cost 0 is free. In images, dark pixels become impassable obstacles (cost -1), and the
+    top row of the image is the top of the grid.
+    :param path: str, location of the file
+    :param width: int, optional width the terrain must have
+    :param height: int, optional height the terrain must have
+    :return: float array of shape (width, height)
+    """
+    if path.endswith(".npy"):
+        terrain = np.load(path)
+    elif path.endswith(".npz"):
+        with np.load(path) as arrays:
+            terrain = arrays[arrays.files[0]]
+    else:
+        import matplotlib.image
+
+        image = matplotlib.image.imread(path)
+        if image.ndim == 3:
+            image = image[..., :3].mean(axis=2)
+        if image.max() > 1:
+            image = image / 255
+
+        terrain = np.where(np.flipud(image).T < 0.5, -1.0, 0.0)
+
+    terrain = np.asarray(terrain, dtype=float)
+    if width is not None and height is not None:
+        assert terrain.shape == (width, height), \
+            "the terrain has shape {}, but the grid is {}x{}".format(terrain.shape, width, height)
+
+    return terrain
+
+
+def maze(width, height, cost=-1):
+    """
+    Generate a maze with a randomised depth-first search. Corridors are one cell wide and walls are obstacles.
+    :param width: int
+    :param height: int
+    :param cost: float, cost of the walls
+    :return: float array of shape (width, height)
+    """
+    terrain = np.full((width, height), float(cost))
+    start = (1 + 2 * np.random.randint(0, (width - 1) // 2), 1 + 2 * np.random.randint(0, (height - 1) // 2))
+    terrain[start] = 0
+    stack = [start]
+
+    while stack:
+        x, y = stack[-1]
+        neighbors = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                     if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and terrain[x + dx, y + dy] != 0]
+        if not neighbors:
+            stack.pop()
+            continue
+
+        nx, ny = neighbors[np.random.randint(len(neighbors))]
+        terrain[(x + nx) // 2, (y + ny) // 2] = 0
+        terrain[nx, ny] = 0
+        stack.append((nx, ny))
+
+    return terrain
+
+
+def clustered(width, height, n_obstacles, n_clusters, spread=2.0, cost=-1):
+    """
+    Generate obstacles that are clustered around a number of random centres.
+    :param width: int
+    :param height: int
+    :param n_obstacles: int, number of obstacles that are drawn, overlapping obstacles are merged
+    :param n_clusters: int, number of clusters
+    :param spread: float, standard deviation of the distance of an obstacle to its centre
+    :param cost: float, cost of the obstacles
+    :return: float array of shape (width, height)
+    """
+    centres = np.column_stack((np.random.randint(0, width, n_clusters), np.random.randint(0, height, n_clusters)))
+    cells = centres[np.random.randint(0, n_clusters, n_obstacles)] + np.random.normal(0, spread, (n_obstacles, 2))
+    cells = np.clip(np.rint(cells).astype(int), 0, (width - 1, height - 1))
+
+    terrain = np.zeros((width, height))
+    terrain[cells[:, 0], cells[:, 1]] = cost
+
+    return terrain